@@ -0,0 +1,75 @@
+"""
+Offline benchmarks of parser hot paths.
+
+Usage::
+
+    python -m benchmarks run                        # run all benchmarks
+    python -m benchmarks run -k "parse.*"           # run only matching benchmarks
+    python -m benchmarks run --save baseline.json   # save results as baseline
+    python -m benchmarks compare baseline.json      # run benchmarks and compare with baseline
+    python -m benchmarks compare baseline.json current.json
+
+`compare` exits with code 1 if any benchmark is slower than baseline by more than threshold.
+"""
+
+import argparse
+import fnmatch
+import sys
+from pathlib import Path
+
+from .runner import compare, load_results, run, save_results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Offline benchmarks of media-parser")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run benchmarks")
+    run_parser.add_argument("--save", type=Path, help="Save results to file")
+
+    compare_parser = commands.add_parser("compare", help="Compare results with baseline")
+    compare_parser.add_argument("baseline", type=Path, help="Baseline results")
+    compare_parser.add_argument("current", type=Path, nargs="?", help="Current results. Benchmarks are run if omitted")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Relative slowdown, that is flagged as regression (default: %(default)s)",
+    )
+    compare_parser.add_argument("--save", type=Path, help="Save current results to file")
+
+    for command in (run_parser, compare_parser):
+        command.add_argument("-k", dest="pattern", default="*", help="Shell-style pattern of benchmark names")
+        command.add_argument("--repeat", type=int, default=5, help="Count of rounds (default: %(default)s)")
+        command.add_argument(
+            "--scale",
+            type=float,
+            default=1,
+            help="Multiplier of calls in one round, e.g. 0.1 for quick run (default: %(default)s)",
+        )
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare" and args.current is not None:
+        current = load_results(args.current)
+    else:
+        current = run(args.pattern, repeat=args.repeat, scale=args.scale)
+    if args.save:
+        save_results(current, args.save)
+        print(f"Results are saved to {args.save}")
+
+    if args.command == "compare":
+        print()
+        baseline = load_results(args.baseline)
+        baseline["results"] = {
+            name: result for name, result in baseline["results"].items() if fnmatch.fnmatchcase(name, args.pattern)
+        }
+        regressions = compare(baseline, current, threshold=args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+Benchmark of media records on 35 images carousel.
+
+Compares building of pydantic models, as parsers did before, with building of lightweight records,
+which parsers and cache use now, and with conversion of records to pydantic models on output.
+
+Run: `python -m benchmarks.carousel`
+"""
+
+import gc
+import timeit
+import tracemalloc
+from collections.abc import Callable
+
+from media_parser.models import GroupedMedia, Image, MediaRecord, ParserType, group_records, to_medias
+from media_parser.parsers.tiktok import TiktokParser
+
+CAROUSEL_SIZE = 35
+ORIGINAL_URL = "https://www.tiktok.com/@author/video/7136001098841591041"
+
+
+def carousel_data(size: int = CAROUSEL_SIZE) -> dict:
+    return {
+        "type": "image",
+        "desc": "Caption of carousel #tag " * 8,
+        "region": "US",
+        "author": {"nickname": "author"},
+        "image_post_info": {
+            "images": [
+                {
+                    "display_image": {
+                        "url_list": [f"https://p16-sign.tiktokcdn-us.com/obj/{i}.jpeg?x-expires=1900000000"],
+                        "height": 1920,
+                        "width": 1080,
+                    }
+                }
+                for i in range(size)
+            ],
+        },
+    }
+
+
+def build_models(data: dict) -> GroupedMedia:
+    info = data["image_post_info"]
+    medias = [
+        Image(
+            type=ParserType.TIKTOK,
+            original_url=ORIGINAL_URL,
+            url=img["url_list"][-1],
+            caption=data["desc"],
+            language=data["region"],
+            height=img["height"],
+            width=img["width"],
+            author=data["author"]["nickname"],
+        )
+        for images in info["images"]
+        if (img := images["display_image"])
+    ]
+    return GroupedMedia.from_medias(medias)
+
+
+def build_records(parser: TiktokParser, data: dict) -> list[MediaRecord]:
+    return parser._process_image(data, ORIGINAL_URL)
+
+
+def measure(name: str, func: Callable[[], object], number: int = 2000) -> None:
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"{name:<32} {seconds * 1e6:>10.1f} us {peak / 1024:>10.1f} KiB")
+
+
+def main() -> None:
+    parser = TiktokParser()
+    data = carousel_data()
+    records = build_records(parser, data)
+
+    print(f"{'case':<32} {'time':>13} {'peak memory':>14}")
+    measure("pydantic models (before)", lambda: build_models(data))
+    measure("records", lambda: build_records(parser, data))
+    measure("records -> list of Media", lambda: to_medias(build_records(parser, data)))
+    measure("records -> GroupedMedia", lambda: group_records(build_records(parser, data)))
+    # Records from in-process cache are copied and converted on every hit
+    measure("cached records -> list of Media", lambda: to_medias([record.copy() for record in records]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Benchmarks of parser hot paths. All of them run offline against recorded payloads from `fixtures`.
+"""
+
+import asyncio
+
+from media_parser.database import GroupedMediaModel, MemoryCache
+from media_parser.decoding import get_decoder
+from media_parser.models import GroupedMedia, MediaRecord, to_medias
+from media_parser.parsers import BaseParser
+from media_parser.parsers.base import MediaCache
+from media_parser.parsers.tiktok import TIKTOK_FEED_FIELDS, TiktokParser
+
+from .runner import benchmark
+from .transport import FixtureTransport, fixture_bytes
+
+CONFIG = {
+    "tiktok": {},
+    # Zero batch windows keep sleep of batching out of CPU measurements
+    "twitter": {"twitter_bearer_token": "token", "batch": {"window": 0}},
+    "reddit": {"client_id": "client-id", "client_secret": "client-secret", "batch": {"window": 0}},
+    "instagram": {},
+    "youtube": {},
+}
+ROUTES = {
+    "https://api16-normal-c-useast1a.tiktokv.com/aweme/v1/feed/?aweme_id=7136001098841591041": "tiktok_video",
+    "https://api16-normal-c-useast1a.tiktokv.com/aweme/v1/feed/?aweme_id=7364744013653527814": "tiktok_image",
+    "https://api.twitter.com/2/tweets": "twitter_tweets",
+    "https://www.instagram.com/graphql/query/": "instagram_graphql",
+    "https://www.reddit.com/api/v1/access_token": "reddit_token",
+    "https://oauth.reddit.com/api/info": "reddit_info",
+    "https://www.youtube.com/youtubei/v1/player": "youtube_player",
+}
+URLS = {
+    "tiktok_video": "https://www.tiktok.com/@traveller/video/7136001098841591041",
+    "tiktok_image": "https://www.tiktok.com/@traveller/photo/7364744013653527814",
+    "twitter": "https://twitter.com/Yoda4ever/status/1580609309217628160",
+    "instagram": "https://www.instagram.com/reel/CqQGB-1ISIw/",
+    "reddit": "https://www.reddit.com/r/videos/comments/2gmzqe/drone_footage/",
+    "youtube": "https://youtu.be/dQw4w9WgXcQ",
+}
+MESSAGE = (
+    "Check these out: "
+    + " and ".join(URLS.values())
+    + ", also https://example.com/page and https://github.com/jag-k/media-parser are not supported."
+)
+ORIGINAL_URL = "https://www.tiktok.com/@traveller/video/7364744013653527814"
+
+
+parser = BaseParser(config=CONFIG)
+transport = FixtureTransport(ROUTES)
+for child in parser._parsers:
+    child._transport = transport
+tiktok: TiktokParser = next(p for p in parser._parsers if isinstance(p, TiktokParser))
+
+video_data = asyncio.run(tiktok._get_media_data(None, 7136001098841591041))
+image_data = asyncio.run(tiktok._get_media_data(None, 7364744013653527814))
+carousel: list[MediaRecord] = tiktok._process_image(image_data, ORIGINAL_URL)
+carousel_medias = to_medias(carousel)
+grouped = GroupedMedia.from_medias(carousel_medias)
+cache_model = GroupedMediaModel.from_records(carousel, ttl=3600, stale_ttl=3600)
+cache_document = cache_model.to_document()
+legacy_document = cache_model.model_dump(by_alias=True)
+memory_cache = MediaCache(memory=MemoryCache(max_size=16))
+memory_cache.memory.set(ORIGINAL_URL, carousel)
+
+
+# Regex dispatch
+
+
+@benchmark("router.route", number=20_000)
+def route():
+    parser.route(URLS["reddit"])
+
+
+@benchmark("router.scan", number=5_000)
+def scan():
+    parser.scan(MESSAGE)
+
+
+@benchmark("router.scan_no_urls", number=20_000)
+def scan_no_urls():
+    parser.scan("Just a chat message without any links, but with a dot. And another one.")
+
+
+# Parsing from recorded payloads, without cache
+
+
+def _parse_records(name: str):
+    async def parse():
+        await parser.parse_records(None, URLS[name])
+
+    return parse
+
+
+for _name in URLS:
+    benchmark(f"parse.{_name}", number=500)(_parse_records(_name))
+
+
+@benchmark("parse.message_to_medias", number=200)
+async def parse_message():
+    await parser.parse(None, MESSAGE)
+
+
+# Processing of TikTok payload
+
+
+@benchmark("tiktok.process_video", number=20_000)
+def process_video():
+    tiktok._process_video(video_data, ORIGINAL_URL)
+
+
+@benchmark("tiktok.process_image", number=2_000)
+def process_image():
+    tiktok._process_image(image_data, ORIGINAL_URL)
+
+
+# Decoding
+
+
+@benchmark("decoding.json", number=200)
+def decode_json():
+    get_decoder("json")(fixture_bytes("tiktok_image"))
+
+
+@benchmark("decoding.auto_projection", number=200)
+def decode_projection():
+    TIKTOK_FEED_FIELDS(get_decoder("auto")(fixture_bytes("tiktok_image")))
+
+
+# Media models
+
+
+@benchmark("models.to_medias", number=2_000)
+def records_to_medias():
+    to_medias(tiktok._process_image(image_data, ORIGINAL_URL))
+
+
+@benchmark("models.from_medias", number=20_000)
+def from_medias():
+    GroupedMedia.from_medias(carousel_medias)
+
+
+@benchmark("models.flat", number=50_000)
+def flat():
+    grouped.flat()
+
+
+@benchmark("models.merge", number=20_000)
+def merge():
+    GroupedMedia.merge(grouped, grouped, grouped)
+
+
+# Cache (de)serialization
+
+
+@benchmark("cache.from_records", number=1_000)
+def cache_from_records():
+    GroupedMediaModel.from_records(carousel, ttl=3600, stale_ttl=3600)
+
+
+@benchmark("cache.to_document", number=1_000)
+def cache_to_document():
+    cache_model.to_document()
+
+
+@benchmark("cache.from_document", number=1_000)
+def cache_from_document():
+    GroupedMediaModel.from_document(cache_document)
+
+
+@benchmark("cache.records_from_document", number=1_000)
+def cache_records_from_document():
+    GroupedMediaModel.records_from_document(cache_document)
+
+
+@benchmark("cache.from_legacy_document", number=1_000)
+def cache_from_legacy_document():
+    GroupedMediaModel.from_document(legacy_document)
+
+
+@benchmark("cache.memory_hit", number=2_000)
+async def cache_memory_hit():
+    try:
+        await memory_cache.find_by_original_url(ORIGINAL_URL)
+    except MediaCache.FoundCache:
+        pass
+
+
+# Schema
+
+
+@benchmark("schema.generate", number=20)
+def generate_schema():
+    BaseParser.generate_schema()
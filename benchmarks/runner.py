@@ -0,0 +1,176 @@
+import asyncio
+import fnmatch
+import gc
+import importlib.metadata
+import json
+import platform
+import statistics
+import time
+import timeit
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+__all__ = (
+    "Benchmark",
+    "benchmark",
+    "compare",
+    "load_results",
+    "run",
+    "save_results",
+)
+
+# Benchmark name -> benchmark
+BENCHMARKS: dict[str, "Benchmark"] = {}
+
+
+@dataclass(slots=True)
+class Benchmark:
+    """
+    Benchmark case.
+
+    :param name: Dotted name of benchmark, e.g. `router.scan`.
+    :param func: Function or coroutine function to measure. It's called without arguments.
+    :param number: Count of calls in one round.
+    """
+
+    name: str
+    func: Callable[[], Any] | Callable[[], Awaitable[Any]]
+    number: int
+
+    def timer(self, loop: asyncio.AbstractEventLoop) -> Callable[[], float]:
+        """
+        Make function, that measures one round and returns time of it in seconds.
+        """
+        if not asyncio.iscoroutinefunction(self.func):
+            return lambda: timeit.timeit(self.func, number=self.number)
+
+        async def measure() -> float:
+            start = time.perf_counter()
+            for _ in range(self.number):
+                await self.func()
+            return time.perf_counter() - start
+
+        return lambda: loop.run_until_complete(measure())
+
+
+def benchmark(name: str, number: int = 1000):
+    """
+    Register function as benchmark.
+
+    :param name: Dotted name of benchmark.
+    :param number: Count of calls in one round.
+    """
+
+    def decorator(func):
+        BENCHMARKS[name] = Benchmark(name, func, number)
+        return func
+
+    return decorator
+
+
+def run(pattern: str = "*", repeat: int = 5, scale: float = 1) -> dict[str, Any]:
+    """
+    Run benchmarks.
+
+    :param pattern: Shell-style pattern of benchmark names.
+    :param repeat: Count of rounds. The best one is used for comparison.
+    :param scale: Multiplier of calls in one round, e.g. `0.1` for quick run.
+    :return: Results with metadata of environment.
+    """
+    # Register benchmarks
+    importlib.import_module("benchmarks.cases")
+
+    results: dict[str, dict[str, float]] = {}
+    loop = asyncio.new_event_loop()
+    try:
+        for name, case in BENCHMARKS.items():
+            if not fnmatch.fnmatchcase(name, pattern):
+                continue
+            case = Benchmark(case.name, case.func, max(1, int(case.number * scale)))
+            timer = case.timer(loop)
+            # Warm up caches and lazy imports
+            timer()
+            gc.collect()
+            rounds = [timer() / case.number for _ in range(repeat)]
+            results[name] = {
+                "best": min(rounds),
+                "median": statistics.median(rounds),
+                "number": case.number,
+            }
+            print(f"{name:<40} {_format_time(min(rounds)):>12} (median {_format_time(statistics.median(rounds))})")
+    finally:
+        loop.close()
+
+    return {
+        "meta": {
+            "created_at": datetime.now(UTC).isoformat(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "media_parser": _package_version(),
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any], threshold: float = 0.1) -> list[str]:
+    """
+    Compare results with baseline and print table.
+
+    :param baseline: Results of baseline run.
+    :param current: Results of current run.
+    :param threshold: Relative slowdown of the best time, that is flagged as regression.
+    :return: Names of regressed benchmarks.
+    """
+    regressions = []
+    base_results, current_results = baseline["results"], current["results"]
+    print(f"{'benchmark':<40} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name in sorted(base_results.keys() | current_results.keys()):
+        base, cur = base_results.get(name), current_results.get(name)
+        if base is None or cur is None:
+            print(f"{name:<40} {_format_row_time(base):>12} {_format_row_time(cur):>12} {'n/a':>9}")
+            continue
+        change = cur["best"] / base["best"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  faster"
+        print(
+            f"{name:<40} {_format_time(base['best']):>12} {_format_time(cur['best']):>12} {change:>+9.1%}{flag}",
+        )
+
+    for key in ("python", "implementation", "platform"):
+        if baseline["meta"].get(key) != current["meta"].get(key):
+            print(f"Warning: {key} differs: {baseline['meta'].get(key)} != {current['meta'].get(key)}")
+    return regressions
+
+
+def save_results(results: dict[str, Any], path: Path) -> None:
+    path.write_text(json.dumps(results, indent=2) + "\n")
+
+
+def load_results(path: Path) -> dict[str, Any]:
+    return json.loads(path.read_text())
+
+
+def _package_version() -> str | None:
+    try:
+        return importlib.metadata.version("media-parser")
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def _format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def _format_row_time(result: dict[str, float] | None) -> str:
+    return _format_time(result["best"]) if result else "-"
@@ -0,0 +1,93 @@
+import contextlib
+import functools
+import json
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Any
+
+import aiohttp
+from multidict import CIMultiDict
+from yarl import URL
+
+from media_parser.transport import Transport, TransportConfig
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+@functools.cache
+def fixture_bytes(name: str) -> bytes:
+    """
+    Get recorded payload from `fixtures` directory.
+
+    :param name: Name of fixture without extension.
+    """
+    return (FIXTURES_DIR / f"{name}.json").read_bytes()
+
+
+def load_fixture(name: str) -> Any:
+    return json.loads(fixture_bytes(name))
+
+
+class FixtureResponse:
+    """
+    Response with recorded payload. Implements part of :class:`aiohttp.ClientResponse`, used by parsers.
+    """
+
+    def __init__(self, url: str, body: bytes, status: int = 200, headers: dict[str, str] | None = None):
+        self.url = URL(url)
+        self.status = status
+        self.headers = CIMultiDict(headers or {})
+        self._body = body
+
+    def raise_for_status(self) -> None:
+        if self.status >= 400:
+            raise aiohttp.ClientResponseError(None, (), status=self.status)
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def text(self) -> str:
+        return self._body.decode()
+
+    async def json(self, **kwargs) -> Any:
+        return json.loads(self._body)
+
+
+class FixtureTransport(Transport):
+    """
+    Transport, that serves recorded payloads instead of making requests.
+
+    :param routes: URL prefix -> name of fixture. The longest matching prefix wins.
+        Prefix can have query, then all its params must be in request, e.g. `https://host/feed/?id=1`.
+    :param config: Transport config (only JSON decoder is used).
+    """
+
+    def __init__(self, routes: dict[str, str], config: TransportConfig | None = None):
+        super().__init__(config)
+        self.routes = [
+            (URL(prefix), name) for prefix, name in sorted(routes.items(), key=lambda item: len(item[0]), reverse=True)
+        ]
+
+    @contextlib.asynccontextmanager
+    async def request(
+        self,
+        method: str,
+        url: str,
+        session: aiohttp.ClientSession | None = None,
+        **kwargs,
+    ) -> AsyncIterator[FixtureResponse]:
+        request_url = URL(url).update_query(kwargs.get("params") or {})
+        for prefix, name in self.routes:
+            if self._match(prefix, request_url):
+                yield FixtureResponse(url, fixture_bytes(name), headers={"Content-Type": "application/json"})
+                return
+        yield FixtureResponse(url, b"", status=404)
+
+    @staticmethod
+    def _match(prefix: URL, url: URL) -> bool:
+        if not str(url.with_query(None)).startswith(str(prefix.with_query(None))):
+            return False
+        return all(url.query.get(key) == value for key, value in prefix.query.items())
+
+    async def close(self) -> None:
+        pass
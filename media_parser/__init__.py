@@ -1,4 +1,5 @@
 from .models.medias import Audio, GroupedMedia, Image, Media, ParserType, Video
+from .models.records import MediaKind, MediaRecord
 from .parsers import *
 
 __all__ = [
@@ -9,5 +10,7 @@ __all__ = [
     "ParserType",
     "Video",
     "Media",
+    "MediaKind",
+    "MediaRecord",
     "BaseParser",
 ]
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Hashable, Mapping
+from dataclasses import dataclass, field
+
+from pydantic import BaseModel, Field
+
+from media_parser.context import detached_context
+
+__all__ = (
+    "BatchConfig",
+    "Batcher",
+)
+
+logger = logging.getLogger(__name__)
+
+
+class BatchConfig(BaseModel):
+    """
+    Config of micro-batching of upstream lookups.
+
+    :param window: Time in seconds, lookups are held for to be sent in one request.
+    :param max_size: Max count of lookups in one request. Full batch is sent without waiting.
+    """
+
+    window: float = Field(
+        default=0.005,
+        ge=0,
+        description="Time in seconds, lookups are held for to be sent in one request (0 sends lookups of one tick)",
+    )
+    max_size: int = Field(
+        default=100,
+        ge=1,
+        le=100,
+        description="Max count of lookups in one request. Full batch is sent without waiting",
+    )
+
+
+@dataclass(slots=True)
+class _Batch[K, V]:
+    futures: dict[K, asyncio.Future[V]] = field(default_factory=dict)
+    timer: asyncio.TimerHandle | None = None
+
+
+class Batcher[K, V]:
+    """
+    Collects concurrent lookups for a short window and loads them with one upstream request.
+
+    Batch is loaded in its own task, so cancelling one of the waiters does not cancel it for the others.
+    It's loaded without deadline and tracing span of the caller, which opened it, because it's shared by other
+    callers: every caller waits for it within its own deadline.
+
+    :param load: Function, that loads values of batch. It's called with group and keys and returns values by key.
+        Keys, which are missing in result, fail with :class:`KeyError`.
+    :param config: Batch config.
+    """
+
+    def __init__(
+        self,
+        load: Callable[[Hashable, list[K]], Awaitable[Mapping[K, V]]],
+        config: BatchConfig | None = None,
+    ):
+        self.load = load
+        self.config = config or BatchConfig()
+        self.batches: dict[Hashable, _Batch[K, V]] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def get(self, key: K, group: Hashable = None) -> V:
+        """
+        Get value of key. Lookup joins open batch of the group or opens a new one.
+
+        :param key: Key, e.g. ID of item.
+        :param group: Group of batch. Only lookups of the same group are batched, e.g. of the same client session.
+        :return: Value of key.
+        :raise: Error of batch load.
+        """
+        batch = self.batches.get(group)
+        if batch is None:
+            batch = self.batches[group] = _Batch()
+        future = batch.futures.get(key)
+        if future is None:
+            future = batch.futures[key] = asyncio.get_running_loop().create_future()
+            if len(batch.futures) >= self.config.max_size:
+                self._flush(group)
+            elif batch.timer is None:
+                batch.timer = asyncio.get_running_loop().call_later(self.config.window, self._flush, group)
+        return await asyncio.shield(future)
+
+    def _flush(self, group: Hashable) -> None:
+        batch = self.batches.pop(group, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = asyncio.get_running_loop().create_task(self._load(group, batch.futures), context=detached_context())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _load(self, group: Hashable, futures: dict[K, asyncio.Future[V]]) -> None:
+        logger.debug("Loading batch of %d keys", len(futures))
+        try:
+            values = await self.load(group, list(futures))
+        except asyncio.CancelledError:
+            for future in futures.values():
+                future.cancel()
+            raise
+        except Exception as e:
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in futures.items():
+            if future.done():
+                continue
+            if key in values:
+                future.set_result(values[key])
+            else:
+                future.set_exception(KeyError(key))
@@ -0,0 +1,223 @@
+import logging
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+
+import aiohttp
+from pydantic import BaseModel, Field
+
+from media_parser import deadline
+from media_parser.metrics import BreakerState, Event, Metrics
+
+__all__ = (
+    "FAILURE_ERRORS",
+    "CircuitBreaker",
+    "CircuitBreakerConfig",
+    "CircuitBreakers",
+    "CircuitOpen",
+)
+
+logger = logging.getLogger(__name__)
+
+# Errors of upstream call, which are counted as failures
+FAILURE_ERRORS: tuple[type[BaseException], ...] = (aiohttp.ClientError, TimeoutError)
+
+
+class CircuitBreakerConfig(BaseModel):
+    """
+    Config of circuit breakers of upstream API endpoints.
+
+    :param window: Count of last calls, which failure rate is computed from.
+    :param min_calls: Min count of calls in window, before breaker can open.
+    :param failure_rate: Share of failed calls in window, which opens breaker.
+    :param slow_call_duration: Calls slower than this are counted as failed.
+    :param open_duration: Time in seconds, breaker stays open before trial calls.
+    :param half_open_calls: Count of trial calls in half-open state. All of them must succeed to close breaker.
+    """
+
+    window: int = Field(default=20, gt=0, description="Count of last calls, which failure rate is computed from")
+    min_calls: int = Field(default=10, gt=0, description="Min count of calls in window, before breaker can open")
+    failure_rate: float = Field(
+        default=0.5, gt=0, le=1, description="Share of failed calls in window, which opens breaker"
+    )
+    slow_call_duration: float | None = Field(
+        default=5,
+        gt=0,
+        description="Calls slower than this in seconds are counted as failed. Set null for count only errors",
+    )
+    open_duration: float = Field(default=30, gt=0, description="Time in seconds, breaker stays open before trial calls")
+    half_open_calls: int = Field(
+        default=1,
+        gt=0,
+        description="Count of trial calls in half-open state. All of them must succeed to close breaker",
+    )
+
+
+class CircuitOpen(Exception):  # noqa: N818
+    """
+    Raised instead of upstream call, while breaker is open.
+    """
+
+    def __init__(self, endpoint: str, retry_in: float):
+        super().__init__(f"Circuit breaker of {endpoint!r} is open for {retry_in:.1f} seconds")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of one upstream endpoint.
+
+    Closed breaker passes calls and counts failures in a sliding window of last calls.
+    When failure rate reaches threshold, breaker opens and rejects calls for `open_duration`.
+    Then it's half-open: a few trial calls are passed, and breaker closes if all of them succeed,
+    or opens again on the first failure.
+
+    :param endpoint: Name of endpoint.
+    :param config: Breaker config.
+    :param on_change: Callback, called with new state.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        config: CircuitBreakerConfig | None = None,
+        on_change: Callable[[BreakerState], None] | None = None,
+    ):
+        self.endpoint = endpoint
+        self.config = config or CircuitBreakerConfig()
+        self.on_change = on_change
+        self.state = BreakerState.CLOSED
+        self.outcomes: deque[bool] = deque()
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trials = 0
+        self.successes = 0
+
+    def acquire(self) -> None:
+        """
+        Check, that call is allowed. Call :meth:`record` or :meth:`release` after it.
+
+        :raise CircuitOpen: If breaker is open or all trial calls are taken.
+        """
+        if self.state == BreakerState.OPEN:
+            retry_in = self.opened_at + self.config.open_duration - time.monotonic()
+            if retry_in > 0:
+                raise CircuitOpen(self.endpoint, retry_in)
+            self._set_state(BreakerState.HALF_OPEN)
+        if self.state == BreakerState.HALF_OPEN:
+            if self.trials >= self.config.half_open_calls:
+                raise CircuitOpen(self.endpoint, 0)
+            self.trials += 1
+
+    def record(self, success: bool) -> None:
+        """
+        Record outcome of call.
+
+        :param success: Call succeeded in time.
+        """
+        if self.state == BreakerState.HALF_OPEN:
+            if not success:
+                self._open()
+                return
+            self.successes += 1
+            if self.successes >= self.config.half_open_calls:
+                self._set_state(BreakerState.CLOSED)
+            return
+        if self.state == BreakerState.OPEN:
+            # Call was started before breaker opened
+            return
+
+        self.outcomes.append(success)
+        if not success:
+            self.failures += 1
+        if len(self.outcomes) > self.config.window and not self.outcomes.popleft():
+            self.failures -= 1
+        calls = len(self.outcomes)
+        if calls >= self.config.min_calls and self.failures / calls >= self.config.failure_rate:
+            self._open()
+
+    def release(self) -> None:
+        """
+        Release call, which outcome says nothing about upstream health, e.g. it's cancelled.
+        """
+        if self.state == BreakerState.HALF_OPEN and self.trials > self.successes:
+            self.trials -= 1
+
+    def _open(self) -> None:
+        self.opened_at = time.monotonic()
+        self._set_state(BreakerState.OPEN)
+        logger.warning("Circuit breaker of %r is open for %s seconds", self.endpoint, self.config.open_duration)
+
+    def _set_state(self, state: BreakerState) -> None:
+        self.state = state
+        self.outcomes.clear()
+        self.failures = self.trials = self.successes = 0
+        if self.on_change is not None:
+            self.on_change(state)
+
+
+class CircuitBreakers:
+    """
+    Circuit breakers of parser, one per upstream endpoint.
+
+    :param config: Breaker config.
+    :param metrics: Metrics hook. State of breakers is reported and short-circuited calls are counted.
+    :param parser: Parser label.
+    """
+
+    def __init__(self, config: CircuitBreakerConfig | None = None, metrics: Metrics | None = None, parser: str = ""):
+        self.config = config or CircuitBreakerConfig()
+        self.metrics = metrics or Metrics()
+        self.parser = parser
+        self.breakers: dict[str, CircuitBreaker] = {}
+
+    def get(self, endpoint: str) -> CircuitBreaker:
+        breaker = self.breakers.get(endpoint)
+        if breaker is None:
+            breaker = self.breakers[endpoint] = CircuitBreaker(
+                endpoint,
+                self.config,
+                on_change=lambda state: self.metrics.breaker(endpoint, state, self.parser),
+            )
+            self.metrics.breaker(endpoint, breaker.state, self.parser)
+        return breaker
+
+    async def call[T](self, endpoint: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        Call upstream through breaker of endpoint.
+
+        :param endpoint: Name of endpoint.
+        :param factory: Function, that returns awaitable with result.
+        :return: Result of factory.
+        :raise CircuitOpen: If breaker is open.
+        """
+        breaker = self.get(endpoint)
+        try:
+            breaker.acquire()
+        except CircuitOpen:
+            self.metrics.count(Event.SHORT_CIRCUIT, self.parser)
+            raise
+
+        start = time.perf_counter()
+        try:
+            result = await factory()
+        except FAILURE_ERRORS:
+            if deadline.expired():
+                # Timed out by deadline of caller, not by upstream
+                breaker.release()
+            else:
+                breaker.record(False)
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        limit = self.config.slow_call_duration
+        breaker.record(limit is None or time.perf_counter() - start <= limit)
+        return result
+
+    def stats(self) -> dict[str, BreakerState]:
+        """
+        Get state of breakers by endpoint.
+        """
+        return {endpoint: breaker.state for endpoint, breaker in self.breakers.items()}
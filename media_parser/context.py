@@ -1,3 +1,24 @@
-from contextvars import ContextVar
+from contextvars import Context, ContextVar, copy_context
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from media_parser.tracing import Span
 
 MAX_SIZE: ContextVar[float] = ContextVar("max-size", default=float("inf"))  # float(str or "inf")
+# Type of parser, that handles current URL. Used as label of metrics
+PARSER: ContextVar[str | None] = ContextVar("parser", default=None)
+# Current tracing span. See `media_parser.tracing`
+SPAN: ContextVar["Span | None"] = ContextVar("span", default=None)
+# Monotonic time, when current parsing must be done. See `media_parser.deadline`
+DEADLINE: ContextVar[float | None] = ContextVar("deadline", default=None)
+
+
+def detached_context() -> Context:
+    """
+    Copy current context without deadline and tracing span of the caller.
+    Use it for tasks, which are shared by several callers: every caller waits for them within its own deadline.
+    """
+    context = copy_context()
+    context.run(DEADLINE.set, None)
+    context.run(SPAN.set, None)
+    return context
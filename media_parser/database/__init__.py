@@ -1,2 +1,4 @@
 from .base import *
+from .memory import *
 from .models import *
+from .writer import *
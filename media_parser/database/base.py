@@ -6,7 +6,10 @@ from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorCollection
 from pydantic import BaseModel, ConfigDict, Field, GetCoreSchemaHandler
 from pydantic_core import core_schema as cs
-from pymongo.results import DeleteResult, InsertOneResult, UpdateResult
+from pymongo import ReplaceOne
+from pymongo.results import DeleteResult, UpdateResult
+
+from media_parser import deadline
 
 logger = logging.Logger(__name__)
 
@@ -40,6 +43,22 @@ class MongoModel[ID: PyObjectId](BaseModel):
     def controller(cls, collection: AsyncIOMotorCollection) -> "MongoModelController[ID, Self]":
         return MongoModelController(collection, cls)
 
+    @classmethod
+    def from_document(cls, document: dict[str, Any]) -> Self:
+        """Make model from stored document.
+
+        :param document: Document from collection.
+        :return: Model.
+        """
+        return cls.model_validate(document)
+
+    def to_document(self) -> dict[str, Any]:
+        """Make document to store in collection.
+
+        :return: Document with `_id`.
+        """
+        return self.model_dump(by_alias=True)
+
 
 class MongoModelController[ID, Model]:
     def __init__(self, collection: AsyncIOMotorCollection, model: type[Model]):
@@ -47,15 +66,31 @@ class MongoModelController[ID, Model]:
         self.model = model
 
     async def find(self, object_id: ID | None) -> Model | None:
-        """Find method to retrieve an object by its ID.
+        """Find method to retrieve an object by its ID. Query is bounded by deadline of current context.
 
         :param object_id: The ID of the object to find.
         :return: The found object if it exists, None otherwise.
+        :raise DeadlineExceeded: If deadline is passed.
+        """
+        data = await self.find_document(object_id)
+        if data is None:
+            return None
+        return self.model.from_document(data)
+
+    async def find_document(self, object_id: ID | None) -> dict[str, Any] | None:
+        """Find stored document by its ID without making model. Query is bounded by deadline of current context.
+
+        :param object_id: The ID of the object to find.
+        :return: The found document if it exists, None otherwise.
+        :raise DeadlineExceeded: If deadline is passed.
         """
         if not object_id:
             return None
+        options = {}
+        if (left := deadline.check()) is not None:
+            options["max_time_ms"] = max(int(left * 1000), 1)
         try:
-            return self.model.model_validate(await self.collection.find_one({"_id": object_id}))
+            return await self.collection.find_one({"_id": object_id}, **options)
         except pymongo.errors.OperationFailure as exc:
             logger.error("Can't find collection %s", object_id, exc_info=exc)
         return None
@@ -72,20 +107,21 @@ class MongoModelController[ID, Model]:
             logger.error("Can't delete", exc_info=exc)
         return None
 
-    async def save(self, obj: Model) -> UpdateResult | InsertOneResult | None:
-        """Save the current document instance to the collection.
+    def upsert(self, obj: Model) -> ReplaceOne:
+        """Make upsert operation of the document instance for bulk write.
+
+        :returns: ReplaceOne operation.
+        """
+        return ReplaceOne({"_id": obj.id}, obj.to_document(), upsert=True)
+
+    async def save(self, obj: Model) -> UpdateResult | None:
+        """Save the current document instance to the collection in one round trip.
 
-        :returns: Update or InsertOne result.
+        :returns: Update result.
         None if it can't be saved.
         """
         try:
-            old = await self.collection.find_one({"_id": obj.id})
-            if old:
-                return await self.collection.update_one(
-                    {"_id": obj.id},
-                    {"$set": obj.model_dump(by_alias=True)},
-                )
-            return await self.collection.insert_one(obj.model_dump(by_alias=True))
+            return await self.collection.replace_one({"_id": obj.id}, obj.to_document(), upsert=True)
         except pymongo.errors.OperationFailure as exc:
             logger.error("Can't save", exc_info=exc)
         return None
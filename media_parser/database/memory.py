@@ -0,0 +1,138 @@
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Self
+
+from pydantic import BaseModel, Field
+
+__all__ = (
+    "MemoryCache",
+    "MemoryCacheConfig",
+)
+
+
+class MemoryCacheConfig(BaseModel):
+    """
+    Config of in-process cache.
+
+    :param max_size: Max total size of cached items.
+    :param ttl: Time to live of cached item in seconds.
+    """
+
+    max_size: int = Field(default=1024, gt=0, description="Max total size of cached items (count of medias)")
+    ttl: float = Field(default=300, gt=0, description="Time to live of cached item in seconds")
+
+
+class MemoryCache[V]:
+    """
+    Bounded in-process LRU cache with per-entry TTL.
+
+    Every entry has a size, calculated by `weigher` (1 by default), and the least recently used
+    entries are evicted while the total size exceeds `max_size`.
+
+    :param max_size: Max total size of cached items.
+    :param ttl: Default time to live of cached item in seconds.
+    :param weigher: Function to calculate size of cached item.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: float = 300,
+        weigher: Callable[[V], int] | None = None,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.weigher = weigher
+
+        self._data: OrderedDict[str, tuple[float, int, V]] = OrderedDict()
+        self.size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @classmethod
+    def from_config(cls, config: MemoryCacheConfig, weigher: Callable[[V], int] | None = None) -> Self:
+        return cls(max_size=config.max_size, ttl=config.ttl, weigher=weigher)
+
+    def get(self, key: str) -> V | None:
+        """
+        Get item from cache.
+
+        :param key: Key of item.
+        :return: Cached item or None if it's missing or expired.
+        """
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+
+        expires_at, _, value = item
+        if expires_at <= time.monotonic():
+            self.pop(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: V, ttl: float | None = None) -> None:
+        """
+        Put item to cache and evict least recently used items if cache is full.
+
+        :param key: Key of item.
+        :param value: Item.
+        :param ttl: Time to live of item in seconds. Default TTL of cache is used if None.
+        """
+        weight = self.weigher(value) if self.weigher else 1
+        if weight > self.max_size:
+            return
+        self.pop(key)
+
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), weight, value)
+        self.size += weight
+
+        while self.size > self.max_size:
+            _, (_, evicted, _) = self._data.popitem(last=False)
+            self.size -= evicted
+            self.evictions += 1
+
+    def pop(self, key: str) -> V | None:
+        """
+        Remove item from cache.
+
+        :param key: Key of item.
+        :return: Removed item or None if it's missing.
+        """
+        item = self._data.pop(key, None)
+        if item is None:
+            return None
+        self.size -= item[1]
+        return item[2]
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.size = 0
+
+    def stats(self) -> dict[str, int]:
+        """
+        Get counters of cache.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "entries": len(self._data),
+            "size": self.size,
+        }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._data
@@ -1,18 +1,238 @@
-from typing import Self
+import zlib
+from datetime import UTC, datetime, timedelta
+from typing import Any, ClassVar, Self
 
-from media_parser.models import GroupedMedia, Media
+from pydantic import Field
+
+from media_parser.models import Audio, GroupedMedia, Image, Media, MediaKind, MediaRecord, ParserType, Video, to_medias
+from media_parser.utils import url_expiry
 
 from .base import MongoModel
 
+# CDN URLs are considered expired a bit before their real expiry
+EXPIRY_MARGIN = timedelta(minutes=5)
+
+# Version of compact document format
+DOCUMENT_VERSION = 2
+# Kind of media in compact document -> field of group
+MEDIA_KINDS: dict[str, str] = {
+    "a": "audios",
+    "i": "images",
+    "v": "videos",
+}
+KIND_OF_MEDIA: dict[type[Media], str] = {Audio: "a", Image: "i", Video: "v"}
+# Kind of media in compact document -> kind of record
+RECORD_KINDS: dict[str, MediaKind] = {"a": MediaKind.AUDIO, "i": MediaKind.IMAGE, "v": MediaKind.VIDEO}
+# Dumped value of parser type -> parser type. Dict lookup is several times faster than ParserType(value)
+PARSER_TYPES: dict[str, ParserType] = {parser_type.value: parser_type for parser_type in ParserType}
+
+
+def as_utc(value: datetime) -> datetime:
+    # Mongo returns naive datetimes in UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value
+
+
+def is_expired(expires_at: datetime | None) -> bool:
+    return expires_at is not None and as_utc(expires_at) <= datetime.now(UTC)
+
+
+def medias_expiry(medias: list[Media] | list[MediaRecord], ttl: float | None = None) -> datetime | None:
+    """
+    Get time, when medias become stale: the earliest expiry of their CDN URLs or fetch time plus TTL.
+
+    :param medias: List of Media or records.
+    :param ttl: Time to live of medias in seconds. None means no TTL.
+    :return: Expiry time or None if medias never expire.
+    """
+    expiries = [
+        expiry - EXPIRY_MARGIN
+        for media in medias
+        for url in (media.url, getattr(media, "max_quality_url", None))
+        if (expiry := url_expiry(url))
+    ]
+    if ttl is not None:
+        expiries.append(datetime.now(UTC) + timedelta(seconds=ttl))
+    return min(expiries, default=None)
+
 
 class GroupedMediaModel(GroupedMedia, MongoModel[str]):
+    """
+    Cached medias of one original URL.
+
+    :param fetched_at: Time, when medias were fetched from upstream.
+    :param expires_at: Time, when medias become stale. None means never.
+    :param purge_at: Time, when stale medias are removed by TTL index. None means never.
+    """
+
+    # Captions longer than this (in bytes) are stored compressed. None disables compression.
+    COMPRESS_CAPTION_FROM: ClassVar[int | None] = 512
+
+    fetched_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    expires_at: datetime | None = None
+    purge_at: datetime | None = None
+
     @classmethod
-    def from_medias(cls, medias: list[Media]) -> Self:
+    def from_medias(
+        cls,
+        medias: list[Media],
+        ttl: float | None = None,
+        stale_ttl: float = 0,
+    ) -> Self:
         self = GroupedMedia.from_medias(medias)
+        expires_at = medias_expiry(medias, ttl)
 
         return cls(
             id=medias[0].original_url,
             audios=self.audios,
             images=self.images,
             videos=self.videos,
+            expires_at=expires_at,
+            purge_at=expires_at + timedelta(seconds=stale_ttl) if expires_at else None,
+        )
+
+    @classmethod
+    def from_records(
+        cls,
+        records: list[MediaRecord],
+        ttl: float | None = None,
+        stale_ttl: float = 0,
+    ) -> Self:
+        return cls.from_medias(to_medias(records), ttl=ttl, stale_ttl=stale_ttl)
+
+    def to_records(self) -> list[MediaRecord]:
+        return [MediaRecord.from_media(media) for media in self.flat()]
+
+    def is_stale(self) -> bool:
+        return is_expired(self.expires_at)
+
+    def to_document(self) -> dict[str, Any]:
+        """
+        Make compact document: fields with default values are omitted, fields with the same value in every media
+        (e.g. caption and author of carousel) are stored once in `c`, and long captions are compressed.
+        """
+        medias = self.flat()
+        dumped = [media.model_dump(mode="json", exclude_defaults=True) for media in medias]
+
+        common: dict[str, Any] = dict(dumped[0]) if dumped else {}
+        for fields in dumped[1:]:
+            common = {key: value for key, value in common.items() if key in fields and fields[key] == value}
+
+        return {
+            "_id": self.id,
+            "v": DOCUMENT_VERSION,
+            "fetched_at": self.fetched_at,
+            "expires_at": self.expires_at,
+            "purge_at": self.purge_at,
+            "c": self._compress(common),
+            "m": [
+                [KIND_OF_MEDIA[type(media)], self._compress({k: v for k, v in fields.items() if k not in common})]
+                for media, fields in zip(medias, dumped, strict=True)
+            ],
+        }
+
+    @classmethod
+    def from_document(cls, document: dict[str, Any]) -> Self:
+        """
+        Make model from document. Compact documents are expanded before validation, legacy ones are validated as is.
+        """
+        if document.get("v") != DOCUMENT_VERSION:
+            return cls.model_validate(document)
+
+        common = cls._decompress(document.get("c", {}))
+        data: dict[str, Any] = {
+            "_id": document["_id"],
+            "fetched_at": document.get("fetched_at"),
+            "expires_at": document.get("expires_at"),
+            "purge_at": document.get("purge_at"),
+        }
+        for field in MEDIA_KINDS.values():
+            data[field] = []
+        for kind, fields in document.get("m", []):
+            data[MEDIA_KINDS[kind]].append(common | cls._decompress(fields))
+        return cls.model_validate(data)
+
+    @classmethod
+    def records_from_document(cls, document: dict[str, Any]) -> list[MediaRecord]:
+        """
+        Make records from document. It's the read path of cache: compact documents are expanded to records directly,
+        without validation of grouped model, legacy ones are validated.
+        """
+        if document.get("v") != DOCUMENT_VERSION:
+            return cls.from_document(document).to_records()
+
+        common = cls._decompress(document.get("c", {}))
+        records = []
+        for kind, fields in document.get("m", []):
+            values = common | cls._decompress(fields)
+            values["type"] = PARSER_TYPES[values["type"]]
+            records.append(MediaRecord(kind=RECORD_KINDS[kind], **values))
+        return records
+
+    @classmethod
+    def _compress(cls, fields: dict[str, Any]) -> dict[str, Any]:
+        caption = fields.get("caption")
+        if cls.COMPRESS_CAPTION_FROM is None or not caption:
+            return fields
+        raw = caption.encode()
+        if len(raw) < cls.COMPRESS_CAPTION_FROM:
+            return fields
+        fields = dict(fields)
+        del fields["caption"]
+        fields["caption_z"] = zlib.compress(raw)
+        return fields
+
+    @staticmethod
+    def _decompress(fields: dict[str, Any]) -> dict[str, Any]:
+        if "caption_z" not in fields:
+            return fields
+        fields = dict(fields)
+        fields["caption"] = zlib.decompress(fields.pop("caption_z")).decode()
+        return fields
+
+
+class MediaAliasModel(MongoModel[str]):
+    """
+    Alias of short link (t.co, vt.tiktok.com, etc.) to canonical URL of media.
+
+    :param original_url: Canonical URL, used as key of media cache.
+    :param expires_at: Time, when alias expires.
+    """
+
+    original_url: str
+    expires_at: datetime
+
+    @classmethod
+    def create(cls, short_url: str, original_url: str, ttl: float) -> Self:
+        return cls(
+            id=short_url,
+            original_url=original_url,
+            expires_at=datetime.now(UTC) + timedelta(seconds=ttl),
+        )
+
+    def expired(self) -> bool:
+        return as_utc(self.expires_at) <= datetime.now(UTC)
+
+
+class OAuthTokenModel(MongoModel[str]):
+    """
+    OAuth access token of upstream API, shared by workers.
+
+    :param access_token: Access token.
+    :param expires_at: Time, when token expires.
+    """
+
+    access_token: str
+    expires_at: datetime
+
+    @classmethod
+    def create(cls, key: str, access_token: str, expires_in: float) -> Self:
+        return cls(
+            id=key,
+            access_token=access_token,
+            expires_at=datetime.now(UTC) + timedelta(seconds=expires_in),
         )
+
+    def expires_in(self) -> float:
+        return (as_utc(self.expires_at) - datetime.now(UTC)).total_seconds()
@@ -0,0 +1,131 @@
+import asyncio
+import contextlib
+import logging
+
+import pymongo.errors
+from pydantic import BaseModel, Field
+from pymongo import ReplaceOne
+
+from .base import MongoModel, MongoModelController
+
+__all__ = (
+    "WriteBehindConfig",
+    "WriteBehindWriter",
+)
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindConfig(BaseModel):
+    """
+    Config of write-behind cache writer.
+
+    :param batch_size: Count of pending documents, that triggers flush.
+    :param flush_interval: Max time in seconds, that document waits for flush.
+    :param max_pending: Max count of pending documents. Saving waits for flush, when it's exceeded.
+    """
+
+    batch_size: int = Field(default=100, gt=0, description="Count of pending documents, that triggers flush")
+    flush_interval: float = Field(default=1, gt=0, description="Max time in seconds, that document waits for flush")
+    max_pending: int = Field(
+        default=10_000,
+        gt=0,
+        description="Max count of pending documents. Saving waits for flush, when it's exceeded",
+    )
+
+
+class WriteBehindWriter:
+    """
+    Write-behind writer, that saves documents with batched bulk upserts in background.
+
+    Documents with the same ID, saved before flush, are written once (the last one wins).
+    Call :meth:`close` on shutdown to flush pending documents.
+
+    :param config: Writer config.
+    """
+
+    def __init__(self, config: WriteBehindConfig | None = None):
+        self.config = config or WriteBehindConfig()
+        # Collection full name -> (controller, document ID -> operation)
+        self._pending: dict[str, tuple[MongoModelController, dict[object, ReplaceOne]]] = {}
+        self._size = 0
+        self._task: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._lock: asyncio.Lock | None = None
+        self._closing = False
+
+        self.written = 0
+        self.batches = 0
+        self.errors = 0
+
+    async def save(self, controller: MongoModelController, obj: MongoModel) -> None:
+        """
+        Schedule saving of document. Returns immediately, unless too many documents are pending.
+
+        :param controller: Controller of collection.
+        :param obj: Document to save.
+        """
+        name = controller.collection.full_name
+        _, operations = self._pending.setdefault(name, (controller, {}))
+        if obj.id not in operations:
+            self._size += 1
+        operations[obj.id] = controller.upsert(obj)
+
+        self._ensure_started()
+        if self._size >= self.config.max_pending:
+            await self.flush()
+        elif self._size >= self.config.batch_size:
+            self._wakeup.set()
+
+    def _ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._lock = asyncio.Lock()
+            self._closing = False
+            self._task = asyncio.create_task(self._run(), name="media-parser-write-behind")
+
+    async def _run(self) -> None:
+        while not self._closing:
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.config.flush_interval)
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """
+        Write all pending documents.
+        """
+        if not self._pending:
+            return
+        async with self._lock:
+            pending, self._pending, self._size = self._pending, {}, 0
+            for controller, operations in pending.values():
+                batch = list(operations.values())
+                try:
+                    await controller.collection.bulk_write(batch, ordered=False)
+                    self.written += len(batch)
+                except pymongo.errors.PyMongoError as exc:
+                    self.errors += 1
+                    logger.error("Can't write %d document(s) to cache", len(batch), exc_info=exc)
+                self.batches += 1
+        logger.debug("Flushed %d collection(s) to cache", len(pending))
+
+    async def close(self) -> None:
+        """
+        Stop background task and flush pending documents.
+        """
+        if self._task is not None:
+            self._closing = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        if self._lock is not None:
+            await self.flush()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "pending": self._size,
+            "written": self.written,
+            "batches": self.batches,
+            "errors": self.errors,
+        }
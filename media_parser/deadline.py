@@ -0,0 +1,85 @@
+import contextlib
+import time
+from collections.abc import Iterator
+
+from media_parser.context import DEADLINE
+
+__all__ = (
+    "DeadlineExceeded",
+    "check",
+    "deadline",
+    "expired",
+    "remaining",
+    "timeout",
+)
+
+
+class DeadlineExceeded(Exception):  # noqa: N818
+    """
+    Raised when stage of parsing is started after deadline.
+    """
+
+
+def remaining() -> float | None:
+    """
+    Get time left until deadline of current context in seconds.
+
+    :return: Time left (negative if deadline is passed) or None if there is no deadline.
+    """
+    at = DEADLINE.get()
+    if at is None:
+        return None
+    return at - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def check() -> float | None:
+    """
+    Check, that deadline of current context is not passed.
+
+    :return: Time left in seconds or None if there is no deadline.
+    :raise DeadlineExceeded: If deadline is passed.
+    """
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("Deadline of parsing is exceeded")
+    return left
+
+
+def timeout(limit: float | None = None) -> float | None:
+    """
+    Bound timeout of stage by deadline of current context.
+
+    :param limit: Own timeout of stage in seconds.
+    :return: The smallest of limit and time left, or None if both are unbounded.
+    """
+    left = remaining()
+    if left is None:
+        return limit
+    left = max(left, 0)
+    return left if limit is None else min(left, limit)
+
+
+@contextlib.contextmanager
+def deadline(seconds: float | None) -> Iterator[float | None]:
+    """
+    Set deadline of code block. Nested deadline can't be later than the outer one.
+
+    Deadline is stored in context variable, so it's propagated to tasks and thread jobs,
+    started inside the block, like :data:`media_parser.context.MAX_SIZE`.
+
+    :param seconds: Time limit in seconds. None keeps the outer deadline.
+    :return: Context manager with monotonic time of deadline.
+    """
+    at = DEADLINE.get()
+    if seconds is not None:
+        at = time.monotonic() + seconds if at is None else min(at, time.monotonic() + seconds)
+    token = DEADLINE.set(at)
+    try:
+        yield at
+    finally:
+        DEADLINE.reset(token)
@@ -0,0 +1,84 @@
+import json
+import logging
+from collections.abc import Callable
+from typing import Any, Literal
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+__all__ = (
+    "JsonDecoderName",
+    "Projection",
+    "get_decoder",
+)
+
+logger = logging.getLogger(__name__)
+
+type JsonDecoderName = Literal["auto", "orjson", "json"]
+type JsonDecoder = Callable[[bytes], Any]
+
+
+def get_decoder(name: JsonDecoderName = "auto") -> JsonDecoder:
+    """
+    Get JSON decoder by name.
+
+    :param name: `orjson`, `json` (standard library) or `auto` (orjson if it's installed).
+    :return: Function, that decodes bytes to python objects.
+    :raise ValueError: If decoder is not available.
+    """
+    if name == "orjson" or (name == "auto" and orjson is not None):
+        if orjson is None:
+            raise ValueError("orjson is not installed")
+        return orjson.loads
+    return json.loads
+
+
+class Projection:
+    """
+    Fields of JSON payload, that parser needs. Other fields are dropped right after decoding,
+    so big upstream responses are not kept in memory.
+
+    Fields are dotted paths. Like in Mongo projections, path is applied to every item of list,
+    e.g. `images.display_image.url_list` keeps `url_list` of every image.
+
+    :param paths: Dotted paths of fields to keep. Field is kept with all nested fields.
+    """
+
+    def __init__(self, *paths: str):
+        self.paths = paths
+        self._tree: dict[str, Any] = {}
+        for path in paths:
+            node = self._tree
+            *parents, leaf = path.split(".")
+            for key in parents:
+                child = node.setdefault(key, {})
+                if child is None:
+                    # Parent is already kept whole
+                    break
+                node = child
+            else:
+                node[leaf] = None
+
+    def __call__(self, data: Any) -> Any:
+        """
+        Apply projection to decoded payload.
+
+        :param data: Decoded payload.
+        :return: Payload only with fields of projection.
+        """
+        return _project(data, self._tree)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}{self.paths!r}"
+
+
+def _project(value: Any, tree: dict[str, Any] | None) -> Any:
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        return [_project(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return value
+    return {key: _project(value[key], subtree) for key, subtree in tree.items() if key in value}
@@ -0,0 +1,152 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import logging
+import time
+from collections.abc import Callable
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+from media_parser import deadline, tracing
+
+__all__ = (
+    "BoundedExecutor",
+    "ExecutorBusy",
+    "ExecutorConfig",
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorConfig(BaseModel):
+    """
+    Config of executor for blocking parser work.
+
+    :param backend: Thread or process pool.
+    :param max_workers: Max count of simultaneously running jobs.
+    :param max_queue: Max count of jobs waiting for a free worker.
+    """
+
+    backend: Literal["thread", "process"] = Field(default="thread", description="Thread or process pool")
+    max_workers: int = Field(default=4, gt=0, description="Max count of simultaneously running jobs")
+    max_queue: int = Field(default=16, ge=0, description="Max count of jobs waiting for a free worker")
+
+
+class ExecutorBusy(Exception):  # noqa: N818
+    """
+    Raised when executor queue is full.
+    """
+
+
+class BoundedExecutor:
+    """
+    Dedicated executor with bounded queue for blocking (or CPU bound) work.
+
+    Pool is created lazily on first job. Thread jobs run in a copy of the current context,
+    so context variables (e.g. :data:`media_parser.context.MAX_SIZE`) are available in them
+    and their tracing spans are children of `executor` span.
+    Process jobs must be picklable module level functions.
+
+    :param config: Executor config.
+    :param name: Name of executor, used as thread name prefix.
+    """
+
+    def __init__(self, config: ExecutorConfig | None = None, name: str = "media-parser"):
+        self.config = config or ExecutorConfig()
+        self.name = name
+        self._pool: concurrent.futures.Executor | None = None
+        self._slots: asyncio.Semaphore | None = None
+
+        self.running = 0
+        self.queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    @property
+    def pool(self) -> concurrent.futures.Executor:
+        if self._pool is None:
+            if self.config.backend == "process":
+                self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.config.max_workers)
+            else:
+                self._pool = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.config.max_workers,
+                    thread_name_prefix=self.name,
+                )
+        return self._pool
+
+    async def run[T](self, func: Callable[..., T], *args) -> T:
+        """
+        Run function in executor.
+
+        :param func: Function to run.
+        :param args: Arguments of function.
+        :return: Result of function.
+        :raise ExecutorBusy: If all workers are busy and queue is full.
+        :raise DeadlineExceeded: If deadline of current context is passed before job is started.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.config.max_workers)
+
+        if self._slots.locked() and self.queued >= self.config.max_queue:
+            self.rejected += 1
+            raise ExecutorBusy(f"Executor {self.name!r} is busy: {self.queued} job(s) in queue")
+
+        with tracing.span("executor", executor=self.name) as current:
+            start = time.perf_counter()
+            self.queued += 1
+            try:
+                async with asyncio.timeout(deadline.check()):
+                    await self._slots.acquire()
+            except TimeoutError:
+                raise deadline.DeadlineExceeded(f"Deadline is exceeded in queue of executor {self.name!r}") from None
+            finally:
+                self.queued -= 1
+
+            wait_time = time.perf_counter() - start
+            self.wait_time_total += wait_time
+            self.wait_time_max = max(self.wait_time_max, wait_time)
+            if current is not None:
+                current.attributes["wait_ms"] = round(wait_time * 1000, 3)
+
+            loop = asyncio.get_running_loop()
+            try:
+                if self.config.backend == "process":
+                    future = self.pool.submit(func, *args)
+                else:
+                    future = self.pool.submit(contextvars.copy_context().run, functools.partial(func, *args))
+            except BaseException:
+                self._slots.release()
+                raise
+
+            self.running += 1
+            # Slot is released when job is really done, even if the waiter is cancelled
+            future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+            return await asyncio.wrap_future(future)
+
+    def _release(self) -> None:
+        self.running -= 1
+        self.completed += 1
+        if self._slots is not None:
+            self._slots.release()
+
+    def stats(self) -> dict[str, float]:
+        """
+        Get queue depth and wait time of executor.
+        """
+        return {
+            "running": self.running,
+            "queued": self.queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_time_total": self.wait_time_total,
+            "wait_time_max": self.wait_time_max,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+        self._pool = None
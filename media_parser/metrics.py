@@ -0,0 +1,296 @@
+import bisect
+import contextlib
+import time
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass, field
+from enum import StrEnum
+
+from media_parser import tracing
+from media_parser.context import PARSER
+
+__all__ = (
+    "DEFAULT_BUCKETS",
+    "BreakerState",
+    "Event",
+    "Histogram",
+    "Metrics",
+    "MetricsRegistry",
+    "Stage",
+)
+
+# Label of metrics, which are not related to one parser (e.g. routing of message)
+ALL_PARSERS = "all"
+# Upper bounds of latency histogram buckets in seconds
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+
+
+class Stage(StrEnum):
+    """
+    Stages of parsing, which latency is measured.
+    """
+
+    ROUTE = "route"
+    CACHE_LOOKUP = "cache_lookup"
+    RESOLVE = "resolve"
+    FETCH = "fetch"
+    PROCESS = "process"
+    CACHE_SAVE = "cache_save"
+    QUOTA_WAIT = "quota_wait"
+
+
+class Event(StrEnum):
+    """
+    Counted events.
+    """
+
+    CACHE_HIT = "cache_hit"
+    CACHE_STALE_HIT = "cache_stale_hit"
+    CACHE_MISS = "cache_miss"
+    ERROR = "error"
+    QUOTA_REJECTED = "quota_rejected"
+    RETRY = "retry"
+    HEDGE = "hedge"
+    RETRY_BUDGET_EXHAUSTED = "retry_budget_exhausted"
+    SHORT_CIRCUIT = "short_circuit"
+    TIMEOUT = "timeout"
+
+
+class BreakerState(StrEnum):
+    """
+    States of circuit breaker.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class Metrics:
+    """
+    Metrics hook of parser. This implementation drops all metrics.
+
+    Subclass it and override :meth:`observe`, :meth:`count`, :meth:`in_flight` and :meth:`breaker` to send metrics
+    to your monitoring system, or use :class:`MetricsRegistry`.
+    Parser label is taken from context, when it's not passed.
+    """
+
+    def observe(self, stage: Stage, seconds: float, parser: str | None = None) -> None:
+        """
+        Observe latency of stage.
+
+        :param stage: Stage of parsing.
+        :param seconds: Latency in seconds.
+        :param parser: Parser label.
+        """
+
+    def count(self, event: Event, parser: str | None = None, value: int = 1) -> None:
+        """
+        Count event.
+
+        :param event: Event.
+        :param parser: Parser label.
+        :param value: Count of events.
+        """
+
+    def in_flight(self, delta: int, parser: str | None = None) -> None:
+        """
+        Change count of in-flight requests.
+
+        :param delta: Change of count.
+        :param parser: Parser label.
+        """
+
+    def breaker(self, endpoint: str, state: BreakerState, parser: str | None = None) -> None:
+        """
+        Report state of circuit breaker.
+
+        :param endpoint: Upstream endpoint of breaker.
+        :param state: New state of breaker.
+        :param parser: Parser label.
+        """
+
+    @contextlib.contextmanager
+    def time(self, stage: Stage, parser: str | None = None) -> Iterator[None]:
+        """
+        Measure latency of code block with monotonic clock. Failed blocks are measured too.
+        Block is also recorded as child span of current tracing span.
+
+        :param stage: Stage of parsing.
+        :param parser: Parser label.
+        """
+        start = time.perf_counter()
+        try:
+            with tracing.span(stage.value):
+                yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, parser)
+
+    @contextlib.contextmanager
+    def track(self, parser: str | None = None) -> Iterator[None]:
+        """
+        Track code block as in-flight request and count error, if it fails.
+
+        :param parser: Parser label.
+        """
+        self.in_flight(1, parser)
+        try:
+            yield
+        except Exception:
+            self.count(Event.ERROR, parser)
+            raise
+        finally:
+            self.in_flight(-1, parser)
+
+
+@dataclass(slots=True)
+class Histogram:
+    """
+    Cumulative histogram of observations.
+
+    :param buckets: Upper bounds of buckets.
+    """
+
+    buckets: Sequence[float]
+    counts: list[int] = field(init=False)
+    sum: float = 0
+    count: int = 0
+
+    def __post_init__(self):
+        self.counts = [0] * len(self.buckets)
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        """
+        Get cumulative counts of buckets, including `+Inf` bucket.
+        """
+        result, total = [], 0
+        for bound, count in zip(self.buckets, self.counts, strict=True):
+            total += count
+            result.append((bound, total))
+        result.append((float("inf"), self.count))
+        return result
+
+
+class MetricsRegistry(Metrics):
+    """
+    In-memory metrics with Prometheus text exporter.
+
+    :param buckets: Upper bounds of latency histogram buckets in seconds.
+    :param prefix: Prefix of metric names in export.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS, prefix: str = "media_parser"):
+        self.buckets = tuple(sorted(buckets))
+        self.prefix = prefix
+        self.histograms: dict[tuple[str, Stage], Histogram] = {}
+        self.counters: dict[tuple[str, Event], int] = {}
+        self.gauges: dict[str, int] = {}
+        self.breakers: dict[tuple[str, str], BreakerState] = {}
+
+    def observe(self, stage: Stage, seconds: float, parser: str | None = None) -> None:
+        key = (_label(parser), stage)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(self.buckets)
+        histogram.observe(seconds)
+
+    def count(self, event: Event, parser: str | None = None, value: int = 1) -> None:
+        key = (_label(parser), event)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def in_flight(self, delta: int, parser: str | None = None) -> None:
+        key = _label(parser)
+        self.gauges[key] = self.gauges.get(key, 0) + delta
+
+    def breaker(self, endpoint: str, state: BreakerState, parser: str | None = None) -> None:
+        self.breakers[(_label(parser), endpoint)] = state
+
+    def histogram(self, stage: Stage, parser: str | None = None) -> Histogram | None:
+        return self.histograms.get((_label(parser), stage))
+
+    def counter(self, event: Event, parser: str | None = None) -> int:
+        return self.counters.get((_label(parser), event), 0)
+
+    def reset(self) -> None:
+        self.histograms.clear()
+        self.counters.clear()
+        self.gauges.clear()
+        self.breakers.clear()
+
+    def to_prometheus(self) -> str:
+        """
+        Export metrics in Prometheus text format.
+        """
+        name = f"{self.prefix}_stage_duration_seconds"
+        lines = [
+            f"# HELP {name} Latency of parsing stages in seconds.",
+            f"# TYPE {name} histogram",
+        ]
+        for (parser, stage), histogram in sorted(self.histograms.items()):
+            labels = f'parser="{_escape(parser)}",stage="{stage}"'
+            for bound, count in histogram.cumulative():
+                lines.append(f'{name}_bucket{{{labels},le="{_format_bound(bound)}"}} {count}')
+            lines.append(f"{name}_sum{{{labels}}} {histogram.sum!r}")
+            lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+        name = f"{self.prefix}_events_total"
+        lines += [
+            f"# HELP {name} Count of cache, error, timeout, quota, retry, hedge and circuit breaker events.",
+            f"# TYPE {name} counter",
+        ]
+        for (parser, event), value in sorted(self.counters.items()):
+            lines.append(f'{name}{{parser="{_escape(parser)}",event="{event}"}} {value}')
+
+        name = f"{self.prefix}_in_flight_requests"
+        lines += [
+            f"# HELP {name} Count of URLs, which are being parsed.",
+            f"# TYPE {name} gauge",
+        ]
+        for parser, value in sorted(self.gauges.items()):
+            lines.append(f'{name}{{parser="{_escape(parser)}"}} {value}')
+
+        name = f"{self.prefix}_circuit_breaker_state"
+        lines += [
+            f"# HELP {name} State of circuit breakers of upstream endpoints.",
+            f"# TYPE {name} gauge",
+        ]
+        for (parser, endpoint), current in sorted(self.breakers.items()):
+            labels = f'parser="{_escape(parser)}",endpoint="{_escape(endpoint)}"'
+            for state in BreakerState:
+                lines.append(f'{name}{{{labels},state="{state}"}} {int(state == current)}')
+        return "\n".join(lines) + "\n"
+
+
+def _label(parser: str | None) -> str:
+    if parser is None:
+        parser = PARSER.get()
+    return str(parser) if parser else ALL_PARSERS
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(float(bound))
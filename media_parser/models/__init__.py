@@ -1,4 +1,5 @@
 from .medias import *
+from .records import *
 
 __all__ = (
     "ParserType",
@@ -7,4 +8,9 @@ __all__ = (
     "Image",
     "Audio",
     "GroupedMedia",
+    "GroupedMediaResult",
+    "MediaKind",
+    "MediaRecord",
+    "group_records",
+    "to_medias",
 )
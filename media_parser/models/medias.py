@@ -1,5 +1,5 @@
 from enum import StrEnum
-from typing import Self
+from typing import Any, Self
 
 from pydantic import BaseModel, Field
 
@@ -10,6 +10,7 @@ __all__ = (
     "Image",
     "Audio",
     "GroupedMedia",
+    "GroupedMediaResult",
 )
 
 
@@ -137,11 +138,15 @@ class GroupedMedia(BaseModel):
         :return: Grouped Media.
         """
 
-        return cls(
-            audios=[m for m in medias if isinstance(m, Audio)],
-            images=[m for m in medias if isinstance(m, Image)],
-            videos=[m for m in medias if isinstance(m, Video)],
-        )
+        audios, images, videos = [], [], []
+        for media in medias:
+            if isinstance(media, Video):
+                videos.append(media)
+            elif isinstance(media, Image):
+                images.append(media)
+            elif isinstance(media, Audio):
+                audios.append(media)
+        return cls(audios=audios, images=images, videos=videos)
 
     def __bool__(self) -> bool:
         """
@@ -187,5 +192,16 @@ class GroupedMedia(BaseModel):
 
 
 class GroupedMediaResult(GroupedMedia):
+    """
+    Grouped medias, parsed from request.
+
+    :param event_id: ID of event, that caused request.
+    :param request_url: Requested URL or text.
+    :param timed_out: URLs, which are not parsed in time.
+    :param trace: Tracing span tree with timings of parsing stages. Filled only on request, for debugging.
+    """
+
     event_id: str | None = None
     request_url: str | None = None
+    timed_out: list[str] = Field(default_factory=list)
+    trace: dict[str, Any] | None = None
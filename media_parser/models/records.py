@@ -0,0 +1,161 @@
+import dataclasses
+import operator
+from dataclasses import dataclass
+from enum import StrEnum
+from typing import Any, Self
+
+from .medias import Audio, GroupedMedia, Image, Media, ParserType, Video
+
+__all__ = (
+    "MediaKind",
+    "MediaRecord",
+    "group_records",
+    "to_medias",
+)
+
+
+class MediaKind(StrEnum):
+    """
+    Kind of media record. Defines model, that record is converted to.
+    """
+
+    AUDIO = "audio"
+    IMAGE = "image"
+    VIDEO = "video"
+
+
+MEDIA_MODELS: dict[MediaKind, type[Media]] = {
+    MediaKind.AUDIO: Audio,
+    MediaKind.IMAGE: Image,
+    MediaKind.VIDEO: Video,
+}
+KIND_OF_MODEL: dict[type[Media], MediaKind] = {model: kind for kind, model in MEDIA_MODELS.items()}
+# Fields of record, that are passed to model of its kind
+MODEL_FIELDS: dict[MediaKind, tuple[str, ...]] = {
+    kind: tuple(name for name in model.model_fields if name != "headers") for kind, model in MEDIA_MODELS.items()
+}
+DEFAULT_MIME_TYPES: dict[MediaKind, str | None] = {
+    kind: model.model_fields["mime_type"].default for kind, model in MEDIA_MODELS.items()
+}
+
+
+@dataclass(slots=True)
+class MediaRecord:
+    """
+    Lightweight internal media, used by parsers and cache instead of pydantic models.
+
+    Records are converted to pydantic models on output, see :meth:`to_media`.
+    Fields, which are not supported by model of kind, are ignored on conversion.
+    Records, which are shared by several parses (e.g. from in-process cache), are copied with :meth:`copy`.
+
+    :param kind: Kind of media.
+    :param type: Type source of media.
+    :param original_url: Original URL of media.
+    :param url: URL to media content.
+    :param mime_type: MIME type of media. Default of model of kind is used if it's not set.
+    """
+
+    kind: MediaKind
+    type: ParserType
+    original_url: str
+    url: str = ""
+    caption: str | None = None
+    thumbnail_url: str | None = None
+    author: str | None = None
+    extra_description: str = ""
+    language: str | None = None
+    mime_type: str | None = None
+    max_quality_url: str | None = None
+    audio_url: str | None = None
+    height: int | None = None
+    width: int | None = None
+    duration: int | None = None
+
+    def __post_init__(self):
+        if self.mime_type is None:
+            self.mime_type = DEFAULT_MIME_TYPES[self.kind]
+
+    def __bool__(self) -> bool:
+        """
+        Return True if record has url.
+        """
+        return bool(self.url)
+
+    def _model_fields(self) -> dict[str, Any]:
+        """
+        Get fields of model of kind.
+        """
+        # Dict literal is several times faster than getattr() by names of MODEL_FIELDS
+        fields = {
+            "type": self.type,
+            "original_url": self.original_url,
+            "url": self.url,
+            "caption": self.caption,
+            "thumbnail_url": self.thumbnail_url,
+            "author": self.author,
+            "extra_description": self.extra_description,
+            "language": self.language,
+            "mime_type": self.mime_type,
+        }
+        if self.kind is MediaKind.VIDEO:
+            fields["max_quality_url"] = self.max_quality_url
+            fields["audio_url"] = self.audio_url
+            fields["height"] = self.height
+            fields["width"] = self.width
+            fields["duration"] = self.duration
+        elif self.kind is MediaKind.IMAGE:
+            fields["max_quality_url"] = self.max_quality_url
+            fields["height"] = self.height
+            fields["width"] = self.width
+        return fields
+
+    def to_media(self) -> Media:
+        """
+        Convert record to pydantic model of its kind. Every call returns a new model.
+        """
+        # Validation of plain dict is several times faster than model_construct()
+        return MEDIA_MODELS[self.kind].model_validate(self._model_fields())
+
+    def copy(self) -> Self:
+        """
+        Make shallow copy of record. It's several times faster than :func:`copy.copy`.
+        """
+        return type(self)(*_record_values(self))
+
+    @classmethod
+    def from_media(cls, media: Media) -> Self:
+        """
+        Make record from pydantic model.
+        """
+        kind = KIND_OF_MODEL[type(media)]
+        return cls(kind=kind, **{name: getattr(media, name) for name in MODEL_FIELDS[kind]})
+
+
+_record_values = operator.attrgetter(*(f.name for f in dataclasses.fields(MediaRecord)))
+
+
+def to_medias(records: list[MediaRecord]) -> list[Media]:
+    """
+    Convert records to pydantic models.
+
+    :param records: List of records.
+    :return: List of Media.
+    """
+    return [record.to_media() for record in records]
+
+
+def group_records(records: list[MediaRecord]) -> GroupedMedia:
+    """
+    Convert records to GroupedMedia in one pass.
+
+    :param records: List of records.
+    :return: Grouped Media.
+    """
+    groups: dict[MediaKind, list[Media]] = {kind: [] for kind in MediaKind}
+    for record in records:
+        groups[record.kind].append(record.to_media())
+    return GroupedMedia(
+        audios=groups[MediaKind.AUDIO],
+        images=groups[MediaKind.IMAGE],
+        videos=groups[MediaKind.VIDEO],
+    )
@@ -0,0 +1,101 @@
+import functools
+import logging
+import time
+from collections.abc import Awaitable, Callable
+
+import aiohttp
+
+from media_parser.database import MongoModelController, OAuthTokenModel
+from media_parser.singleflight import SingleFlight
+
+__all__ = ("TokenManager",)
+
+logger = logging.getLogger(__name__)
+
+
+class TokenManager:
+    """
+    Keeps OAuth access token of upstream API.
+
+    Token is cached in process and optionally in Mongo, so other workers don't request their own tokens.
+    It's refreshed before expiry, and concurrent refreshes share one request.
+
+    :param key: Key of token in Mongo, e.g. `reddit:<client id>`.
+    :param fetch: Function, that requests new token and returns it with its lifetime in seconds.
+    :param refresh_margin: Token is refreshed this count of seconds before expiry.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        fetch: Callable[[aiohttp.ClientSession | None], Awaitable[tuple[str, float]]],
+        refresh_margin: float = 300,
+    ):
+        self.key = key
+        self.fetch = fetch
+        self.refresh_margin = refresh_margin
+        self.access_token: str | None = None
+        self.expires_at = 0.0
+        self._flights: SingleFlight[str] = SingleFlight()
+
+    def fresh(self) -> bool:
+        return self.access_token is not None and time.monotonic() < self.expires_at - self.refresh_margin
+
+    async def get(
+        self,
+        session: aiohttp.ClientSession | None = None,
+        controller: MongoModelController[str, OAuthTokenModel] | None = None,
+    ) -> str:
+        """
+        Get access token.
+
+        :param session: Client session for token request.
+        :param controller: Controller of shared tokens in Mongo.
+        :return: Access token.
+        """
+        if self.fresh():
+            return self.access_token
+        return await self._flights.do(self.key, functools.partial(self._refresh, session, controller, shared=True))
+
+    async def renew(
+        self,
+        rejected: str,
+        session: aiohttp.ClientSession | None = None,
+        controller: MongoModelController[str, OAuthTokenModel] | None = None,
+    ) -> str:
+        """
+        Get new access token instead of rejected one, e.g. when upstream responded with 401.
+
+        :param rejected: Rejected access token.
+        :param session: Client session for token request.
+        :param controller: Controller of shared tokens in Mongo.
+        :return: Access token.
+        """
+        if self.access_token != rejected and self.fresh():
+            # Already renewed by concurrent request
+            return self.access_token
+        self.access_token = None
+        return await self._flights.do(self.key, functools.partial(self._refresh, session, controller, shared=False))
+
+    async def _refresh(
+        self,
+        session: aiohttp.ClientSession | None,
+        controller: MongoModelController[str, OAuthTokenModel] | None,
+        shared: bool,
+    ) -> str:
+        if shared and controller is not None:
+            token = await controller.find(self.key)
+            if token is not None and (expires_in := token.expires_in()) > self.refresh_margin:
+                logger.debug("Using shared token %s", self.key)
+                return self._set(token.access_token, expires_in)
+
+        access_token, expires_in = await self.fetch(session)
+        logger.info("Got new token %s for %d seconds", self.key, expires_in)
+        if controller is not None:
+            await controller.save(OAuthTokenModel.create(self.key, access_token, expires_in))
+        return self._set(access_token, expires_in)
+
+    def _set(self, access_token: str, expires_in: float) -> str:
+        self.access_token = access_token
+        self.expires_at = time.monotonic() + expires_in
+        return access_token
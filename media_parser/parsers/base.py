@@ -1,88 +1,361 @@
 import asyncio
+import functools
 import json
 import logging
 import re
-import time
-from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Awaitable, Callable
+from datetime import UTC, datetime
 from re import Match, Pattern
 from typing import Any, ClassVar, Required, Self, TypedDict
 
 import aiohttp
 from motor.motor_asyncio import AsyncIOMotorCollection
-from pydantic import BaseModel, ConfigDict, PrivateAttr
-
-from media_parser.database import GroupedMediaModel, MongoModelController
-from media_parser.models import Media, ParserType
-from media_parser.utils import generate_timer
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+
+from media_parser import deadline, tracing
+from media_parser.breaker import CircuitBreakerConfig, CircuitBreakers, CircuitOpen
+from media_parser.context import PARSER
+from media_parser.database import (
+    GroupedMediaModel,
+    MediaAliasModel,
+    MemoryCache,
+    MemoryCacheConfig,
+    MongoModel,
+    MongoModelController,
+    OAuthTokenModel,
+    WriteBehindConfig,
+    WriteBehindWriter,
+    as_utc,
+    is_expired,
+    medias_expiry,
+)
+from media_parser.executor import BoundedExecutor, ExecutorConfig
+from media_parser.metrics import BreakerState, Event, Metrics, Stage
+from media_parser.models import GroupedMediaResult, Media, MediaRecord, ParserType, group_records, to_medias
+from media_parser.quota import QuotaConfig, QuotaManager
+from media_parser.retry import RetryConfig, RetryPolicy
+from media_parser.router import Router
+from media_parser.singleflight import SingleFlight
+from media_parser.transport import Transport, TransportConfig
 
 logger = logging.getLogger(__name__)
-time_it = generate_timer(logger)
+
+ALIASES_COLLECTION = "aliases"
+TOKENS_COLLECTION = "tokens"
+# Options of parser, which are set for the whole set of parsers, not per parser
+SET_OPTIONS = ("memory_cache", "write_behind", "transport", "quota")
 
 
 class MediaCache:
-    def __init__(self, cache_collection: AsyncIOMotorCollection | None = None):
+    def __init__(
+        self,
+        cache_collection: AsyncIOMotorCollection | None = None,
+        memory: MemoryCache[list[MediaRecord]] | None = None,
+        flights: SingleFlight[list[MediaRecord]] | None = None,
+        aliases: MemoryCache[str] | None = None,
+        writer: WriteBehindWriter | None = None,
+        ttls: dict[ParserType, float | None] | None = None,
+        stale_ttls: dict[ParserType, float] | None = None,
+        metrics: Metrics | None = None,
+        cache_only: bool = False,
+    ):
         self.controller: MongoModelController[str, GroupedMediaModel] | None = None
+        self.alias_controller: MongoModelController[str, MediaAliasModel] | None = None
+        self.token_controller: MongoModelController[str, OAuthTokenModel] | None = None
         if cache_collection:
             self.controller = GroupedMediaModel.controller(collection=cache_collection)
+            self.alias_controller = MediaAliasModel.controller(collection=cache_collection[ALIASES_COLLECTION])
+            self.token_controller = OAuthTokenModel.controller(collection=cache_collection[TOKENS_COLLECTION])
+        self.memory = memory
+        self.flights = flights
+        self.aliases = aliases
+        self.writer = writer
+        self.ttls = ttls or {}
+        self.stale_ttls = stale_ttls or {}
+        self.metrics = metrics or Metrics()
+        self.cache_only = cache_only
+
+    @staticmethod
+    async def ensure_indexes(cache_collection: AsyncIOMotorCollection) -> None:
+        """
+        Create indexes, used by cache. Call it once on startup.
+
+        :param cache_collection: Collection of media cache.
+        """
+        await cache_collection.create_index("purge_at", expireAfterSeconds=0)
+        await cache_collection[ALIASES_COLLECTION].create_index("expires_at", expireAfterSeconds=0)
+        await cache_collection[TOKENS_COLLECTION].create_index("expires_at", expireAfterSeconds=0)
 
     class FoundCache(Exception):  # noqa: N818
-        def __init__(self, medias: list[Media], original_url: str, *args) -> None:
+        def __init__(self, medias: list[MediaRecord], original_url: str, *args, stale: bool = False) -> None:
             super().__init__(medias, original_url, *args)
             self.medias = medias
             self.original_url = original_url
+            self.stale = stale
 
     async def find_by_original_url(self, original_url: str | None = None) -> None:
-        if not self.controller or not original_url:
+        # Without cache layers there are neither hits nor misses
+        if not original_url or (self.memory is None and not self.controller):
             return
-        data: GroupedMediaModel | None = await self.controller.find(original_url)
-        if data:
+        with self.metrics.time(Stage.CACHE_LOOKUP):
+            await self._find_by_original_url(original_url)
+        self.metrics.count(Event.CACHE_MISS)
+
+    async def _find_by_original_url(self, original_url: str) -> None:
+        if self.memory is not None and (medias := self.memory.get(original_url)):
+            self.metrics.count(Event.CACHE_HIT)
             raise self.FoundCache(
-                medias=data.flat(),
+                medias=[record.copy() for record in medias],
                 original_url=original_url,
             )
+        if not self.controller:
+            return
+        document = await self.controller.find_document(original_url)
+        if document:
+            medias = GroupedMediaModel.records_from_document(document)
+            expires_at = document.get("expires_at")
+            stale = is_expired(expires_at)
+            if not stale:
+                self._remember(original_url, medias, expires_at)
+            self.metrics.count(Event.CACHE_STALE_HIT if stale else Event.CACHE_HIT)
+            raise self.FoundCache(
+                medias=medias,
+                original_url=original_url,
+                stale=stale,
+            )
 
-    async def save(self, media: Media) -> Media:
+    def _remember(self, original_url: str, medias: list[MediaRecord], expires_at: datetime | None) -> None:
+        if self.memory is None:
+            return
+        ttl = self.memory.ttl
+        if expires_at is not None:
+            ttl = min(ttl, (as_utc(expires_at) - datetime.now(UTC)).total_seconds())
+        if ttl > 0:
+            # Cached records are copied in and out, so changes of caller don't leak to other parses
+            self.memory.set(original_url, [record.copy() for record in medias], ttl=ttl)
+
+    async def fetch(
+        self,
+        original_url: str,
+        factory: Callable[[aiohttp.ClientSession | None], Awaitable[list[MediaRecord]]],
+        session: aiohttp.ClientSession | None = None,
+    ) -> list[MediaRecord]:
+        """
+        Find medias in cache or get them from factory.
+
+        Concurrent fetches of the same `original_url` share one call of factory, which outlives its callers,
+        so it runs with pooled transport: session of caller is used only when fetches are not coalesced.
+        Stale medias are returned immediately, while factory refreshes them in background.
+        In cache-only mode factory is never called, and nothing is returned on cache miss.
+
+        :param original_url: Canonical URL of media.
+        :param factory: Function, that gets medias from upstream with client session and saves them to cache.
+        :param session: Client session of caller. It's used only when fetches are not coalesced.
+        :return: List of media records.
+        :raise FoundCache: If medias were found in cache.
+        """
+        try:
+            await self.find_by_original_url(original_url)
+        except self.FoundCache as e:
+            if not e.stale or self.cache_only:
+                raise
+            if self.flights is None:
+                return await factory(session)
+            logger.info("Refreshing stale cache for %s", original_url)
+            self.flights.start(original_url, functools.partial(factory, None))
+            raise
+        if self.cache_only:
+            return []
+        if self.flights is None:
+            return await factory(session)
+        # Caller, which started the flight, may be cancelled and close its session, while others still wait
+        medias = await self.flights.do(original_url, functools.partial(factory, None))
+        # Waiters of the flight get the same records
+        return [record.copy() for record in medias]
+
+    async def find_alias(self, short_url: str) -> str | None:
+        """
+        Find canonical URL of short link.
+
+        :param short_url: Short link, e.g. `https://t.co/sOHvySZwUo`.
+        :return: Canonical URL or None if short link is unknown or alias is expired.
+        """
+        if self.aliases is not None and (original_url := self.aliases.get(short_url)):
+            return original_url
+        if not self.alias_controller:
+            return None
+        alias: MediaAliasModel | None = await self.alias_controller.find(short_url)
+        if not alias or alias.expired():
+            return None
+        if self.aliases is not None:
+            self.aliases.set(short_url, alias.original_url)
+        logger.info("Found alias %s -> %s", short_url, alias.original_url)
+        return alias.original_url
+
+    async def save_alias(self, short_url: str, original_url: str, ttl: float) -> None:
+        """
+        Save canonical URL of short link, so next time redirects are not resolved.
+
+        :param short_url: Short link.
+        :param original_url: Canonical URL.
+        :param ttl: Time to live of alias in seconds.
+        """
+        if self.aliases is not None:
+            self.aliases.set(short_url, original_url, ttl=min(self.aliases.ttl, ttl))
+        if self.alias_controller:
+            await self._save(self.alias_controller, MediaAliasModel.create(short_url, original_url, ttl))
+
+    async def save(self, media: MediaRecord) -> MediaRecord:
         return (await self.save_group([media]))[0]
 
-    async def save_group(self, medias: list[Media]) -> list[Media]:
+    async def save_group(self, medias: list[MediaRecord]) -> list[MediaRecord]:
+        if not medias:
+            return medias
+        with self.metrics.time(Stage.CACHE_SAVE):
+            return await self._save_group(medias)
+
+    async def _save_group(self, medias: list[MediaRecord]) -> list[MediaRecord]:
+        ttl = self.ttls.get(medias[0].type)
         if not self.controller:
+            self._remember(medias[0].original_url, medias, medias_expiry(medias, ttl))
             return medias
-        grouped_media = GroupedMediaModel.from_medias(medias)
-        res = await self.controller.save(grouped_media)
-        logger.info("Saved %d item(s) to cache for %s", len(medias), res)
+        grouped_media = GroupedMediaModel.from_records(
+            medias, ttl=ttl, stale_ttl=self.stale_ttls.get(medias[0].type, 0)
+        )
+        self._remember(grouped_media.id, medias, grouped_media.expires_at)
+        await self._save(self.controller, grouped_media)
+        logger.info("Saved %d item(s) to cache for %s", len(medias), grouped_media.id)
         return medias
 
+    async def _save(self, controller: MongoModelController, obj: MongoModel) -> None:
+        if self.writer is not None:
+            await self.writer.save(controller, obj)
+        else:
+            await controller.save(obj)
+
 
-class BaseParserConfig(TypedDict):
+class BaseParserConfig(TypedDict, total=False):
     type: Required[ParserType]
+    hosts: tuple[str, ...]
 
 
-class BaseParser(ABC, BaseModel):
+class BaseParser(BaseModel):
     TYPE: ClassVar[ParserType]
+    HOSTS: ClassVar[tuple[str, ...]] = ()
     _parsers: list["BaseParser"] = PrivateAttr(default_factory=list)
-
-    def __init__(self, *args, config: dict[str, dict[str, Any]] | None = None, **kwargs):
+    _router: Router = PrivateAttr()
+    _memory: MemoryCache[list[MediaRecord]] | None = PrivateAttr(default=None)
+    _flights: SingleFlight[list[MediaRecord]] = PrivateAttr(default_factory=SingleFlight)
+    _aliases: MemoryCache[str] | None = PrivateAttr(default=None)
+    _transport: Transport = PrivateAttr()
+    _executor: BoundedExecutor = PrivateAttr()
+    _writer: WriteBehindWriter | None = PrivateAttr(default=None)
+    _metrics: Metrics = PrivateAttr(default_factory=Metrics)
+    _quota: QuotaManager = PrivateAttr()
+    _retry: RetryPolicy = PrivateAttr()
+    _breakers: CircuitBreakers = PrivateAttr()
+
+    memory_cache: MemoryCacheConfig | None = Field(
+        default=None,
+        description="Set this for enable in-process cache in front of the Mongo cache. It's shared by all parsers",
+    )
+    alias_ttl: float = Field(
+        default=7 * 24 * 60 * 60,
+        gt=0,
+        description="Time to live of short link aliases in seconds",
+    )
+    cache_ttl: float | None = Field(
+        default=None,
+        gt=0,
+        description="Time in seconds, cached medias stay fresh. Expiry of CDN URLs is applied anyway",
+    )
+    stale_ttl: float = Field(
+        default=24 * 60 * 60,
+        ge=0,
+        description="Time in seconds, stale medias are served while they are refreshed in background",
+    )
+    write_behind: WriteBehindConfig | None = Field(
+        default=None,
+        description="Set this for save cache in background with batched bulk upserts. It's shared by all parsers",
+    )
+    transport: TransportConfig = Field(
+        default_factory=TransportConfig,
+        description="HTTP transport config, shared by all parsers of the set",
+    )
+    executor: ExecutorConfig = Field(
+        default_factory=ExecutorConfig,
+        description="Executor config for blocking work of parser",
+    )
+    quota: QuotaConfig = Field(
+        default_factory=QuotaConfig,
+        description="Quota tracking of rate-limited upstream APIs, shared by all parsers of the set",
+    )
+    retry: RetryConfig = Field(
+        default_factory=RetryConfig,
+        description="Retries and hedged requests of upstream API calls of parser",
+    )
+    breaker: CircuitBreakerConfig = Field(
+        default_factory=CircuitBreakerConfig,
+        description="Circuit breakers of upstream API endpoints of parser",
+    )
+
+    def __init__(
+        self,
+        *args,
+        config: dict[str, dict[str, Any]] | None = None,
+        metrics: Metrics | None = None,
+        parent: "BaseParser | None" = None,
+        **kwargs,
+    ):
         super().__init__(*args, **kwargs)
         if config is None:
             config = {}
 
+        if parent is None:
+            # Parser, created by user, owns resources, which are shared by all parsers of the set
+            if metrics is not None:
+                self._metrics = metrics
+            self._transport = Transport(self.transport)
+            self._quota = QuotaManager(self.quota, self._metrics)
+            if self.memory_cache:
+                self._memory = MemoryCache.from_config(self.memory_cache, weigher=len)
+                self._aliases = MemoryCache.from_config(self.memory_cache)
+            if self.write_behind:
+                self._writer = WriteBehindWriter(self.write_behind)
+        else:
+            self._metrics = parent._metrics
+            self._transport = parent._transport
+            self._quota = parent._quota
+
+        self._executor = BoundedExecutor(self.executor, name=f"media-parser-{self.__class__.__name__.lower()}")
         if type(self) is BaseParser:
             self._parsers: list[BaseParser] = [
-                parser(**conf)
+                parser(**self._check_config(parser, conf), parent=self)
                 for parser in BaseParser.__subclasses__()
                 if (conf := config.get(parser.TYPE.value.lower(), None)) is not None
             ]
         else:
             self._parsers = [self]
+            self._breakers = CircuitBreakers(self.breaker, self._metrics, self.TYPE.value)
+            self._retry = RetryPolicy(self.retry, self._metrics, self._breakers)
+
+        self._router = Router(self.parsers)
+
+    @classmethod
+    def _check_config(cls, parser: type["BaseParser"], conf: dict[str, Any]) -> dict[str, Any]:
+        if shared := [name for name in SET_OPTIONS if name in conf]:
+            raise ValueError(
+                f"{', '.join(shared)} of {parser.TYPE.value} parser can't be set per parser: "
+                f"they are shared by all parsers, pass them to {cls.__name__}"
+            )
+        return conf
 
     def supported(self) -> dict[ParserType, bool]:
         return {parser.TYPE: parser._is_supported() for parser in self._parsers}
 
-    @abstractmethod
     def reg_exps(self) -> list[Pattern[str]]:
         raise NotImplementedError
 
-    @abstractmethod
     def _is_supported(self) -> bool:
         raise NotImplementedError
 
@@ -90,40 +363,285 @@ class BaseParser(ABC, BaseModel):
     def parsers(self) -> list[Self]:
         return [p for p in self._parsers if p._is_supported()]
 
-    @abstractmethod
+    async def warmup(self) -> None:
+        """
+        Pre-connect to configured upstreams. Call it once on startup.
+        """
+        await self._transport.warmup()
+
+    async def close(self) -> None:
+        """
+        Flush pending cache writes, close HTTP transport and executors. Call it once on shutdown.
+        """
+        if self._writer is not None:
+            await self._writer.close()
+        await self._transport.close()
+        self._executor.shutdown(wait=False)
+        for parser in self._parsers:
+            if parser is not self:
+                parser._executor.shutdown(wait=False)
+
+    def executor_stats(self) -> dict[ParserType, dict[str, float]]:
+        """
+        Get queue depth and wait time of executors.
+        """
+        return {parser.TYPE: parser._executor.stats() for parser in self._parsers}
+
+    def quota_stats(self) -> dict[str, dict[str, float | None]]:
+        """
+        Get known state of upstream API quotas.
+        """
+        return self._quota.stats()
+
+    def breaker_stats(self) -> dict[ParserType, dict[str, BreakerState]]:
+        """
+        Get state of circuit breakers of upstream endpoints.
+        """
+        return {parser.TYPE: parser._breakers.stats() for parser in self._parsers}
+
+    def cache_stats(self) -> dict[str, int]:
+        """
+        Get hit/miss counters of in-process cache.
+
+        :return: Counters or empty dict if in-process cache is disabled.
+        """
+        if self._memory is None:
+            return {}
+        return self._memory.stats()
+
+    def route(self, url: str) -> list[tuple["BaseParser", Match[str]]]:
+        """
+        Find parsers for URL using precompiled host-indexed router.
+
+        :param url: URL to route.
+        :return: List of parsers with match of their pattern.
+        """
+        return self._router.route(url)
+
+    def scan(self, text: str) -> list[tuple["BaseParser", Match[str]]]:
+        """
+        Find all supported URLs in text, e.g. chat message.
+
+        :param text: Text to scan.
+        :return: List of parsers with match of their pattern, without duplicates.
+        """
+        return self._router.scan(text)
+
     async def _parse(
         self,
-        session: aiohttp.ClientSession,
+        session: aiohttp.ClientSession | None,
         match: Match,
         cache: MediaCache,
-    ) -> list[Media]:
+    ) -> list[MediaRecord]:
         raise NotImplementedError
 
     async def parse(
         self,
-        session: aiohttp.ClientSession,
+        session: aiohttp.ClientSession | None,
         string: str,
         cache_collection: AsyncIOMotorCollection | None = None,
+        timeout: float | None = None,  # noqa: ASYNC109
+        cache_only: bool = False,
     ) -> list[Media]:
-        start_time = time.time()
-        cache = MediaCache(cache_collection=cache_collection)
-
-        gather = [
-            _get_media(session, parser, match, cache)
-            for parser in self.parsers
-            for reg_exp in parser.reg_exps()
-            if (match := reg_exp.match(string))
-        ]
-
-        with time_it("parsing"):
-            result: list[Media] = [j for i in await asyncio.gather(*gather) for j in i if j]
-
-        logger.info(
-            "Parsed %d items in %.4f seconds",
-            len(result),
-            time.time() - start_time,
+        """
+        Parse medias from all supported URLs in string.
+
+        :param session: Client session for resolving short links. Pass None to use pooled transport of parser.
+            Medias are fetched through pooled transport anyway, because fetches are shared by concurrent parses.
+        :param string: String with URLs, e.g. chat message.
+        :param cache_collection: Mongo collection for cache.
+        :param timeout: Time limit in seconds. Medias of URLs, which are not parsed in time, are skipped.
+        :param cache_only: Return only cached medias without requests to upstreams.
+        :return: List of Media.
+        """
+        return to_medias(await self.parse_records(session, string, cache_collection, timeout, cache_only))
+
+    async def parse_iter(
+        self,
+        session: aiohttp.ClientSession | None,
+        string: str,
+        cache_collection: AsyncIOMotorCollection | None = None,
+        timeout: float | None = None,  # noqa: ASYNC109
+        cache_only: bool = False,
+    ) -> AsyncIterator[list[Media]]:
+        """
+        Parse medias like :meth:`parse`, but yield medias of every URL as soon as it's parsed.
+        Cached URLs come out first, without waiting for slow upstreams of other URLs.
+
+        If parsing of some URL fails, error is raised after medias of the rest URLs are yielded.
+        Parsing is cancelled, when iteration is stopped early.
+
+        :param session: Client session for resolving short links. Pass None to use pooled transport of parser.
+            Medias are fetched through pooled transport anyway, because fetches are shared by concurrent parses.
+        :param string: String with URLs, e.g. chat message.
+        :param cache_collection: Mongo collection for cache.
+        :param timeout: Time limit in seconds. Medias of URLs, which are not parsed in time, are skipped.
+        :param cache_only: Return only cached medias without requests to upstreams.
+        :return: Async iterator of medias of one URL.
+        """
+        results: asyncio.Queue[list[MediaRecord] | None] = asyncio.Queue()
+        # Parsing runs in its own task, so its deadline and spans are not bound to steps of iterator
+        producer = asyncio.ensure_future(
+            self._parse_all(session, string, cache_collection, timeout, cache_only, on_result=results.put_nowait)
+        )
+        producer.add_done_callback(lambda _: results.put_nowait(None))
+        try:
+            while (records := await results.get()) is not None:
+                yield to_medias(records)
+            producer.result()
+        finally:
+            producer.cancel()
+
+    async def parse_grouped(
+        self,
+        session: aiohttp.ClientSession | None,
+        string: str,
+        cache_collection: AsyncIOMotorCollection | None = None,
+        timeout: float | None = None,  # noqa: ASYNC109
+        cache_only: bool = False,
+        event_id: str | None = None,
+        trace: bool = False,
+    ) -> GroupedMediaResult:
+        """
+        Parse medias like :meth:`parse`, but group them by kind.
+
+        :param session: Client session for resolving short links. Pass None to use pooled transport of parser.
+            Medias are fetched through pooled transport anyway, because fetches are shared by concurrent parses.
+        :param string: String with URLs, e.g. chat message.
+        :param cache_collection: Mongo collection for cache.
+        :param timeout: Time limit in seconds. URLs, which are not parsed in time, are listed in `timed_out`.
+        :param cache_only: Return only cached medias without requests to upstreams.
+        :param event_id: ID of event, that caused request.
+        :param trace: Attach tracing span tree with timings of parsing stages to result. Use it for debugging.
+        :return: Grouped medias.
+        """
+        with tracing.trace("request") as root:
+            records, timed_out = await self._parse_all(session, string, cache_collection, timeout, cache_only)
+        grouped = group_records(records)
+        return GroupedMediaResult(
+            audios=grouped.audios,
+            images=grouped.images,
+            videos=grouped.videos,
+            event_id=event_id,
+            request_url=string,
+            timed_out=timed_out,
+            trace=root.to_dict() if trace else None,
         )
-        return result
+
+    async def parse_records(
+        self,
+        session: aiohttp.ClientSession | None,
+        string: str,
+        cache_collection: AsyncIOMotorCollection | None = None,
+        timeout: float | None = None,  # noqa: ASYNC109
+        cache_only: bool = False,
+    ) -> list[MediaRecord]:
+        """
+        Parse medias like :meth:`parse`, but return lightweight records without conversion to pydantic models.
+        Use :meth:`MediaRecord.to_media` to convert only records you need.
+
+        Parsing is traced: it opens span `parse` (child of current span, if any) with child spans per URL and stage.
+        Wrap call in :func:`media_parser.tracing.trace` to get span tree.
+
+        Timeout sets deadline of parsing (see :mod:`media_parser.deadline`), which bounds HTTP requests,
+        executor jobs and cache lookups. When it's passed, parsing of the rest URLs is cancelled.
+
+        :param session: Client session for resolving short links. Pass None to use pooled transport of parser.
+            Medias are fetched through pooled transport anyway, because fetches are shared by concurrent parses.
+        :param string: String with URLs, e.g. chat message.
+        :param cache_collection: Mongo collection for cache.
+        :param timeout: Time limit in seconds. Medias of URLs, which are not parsed in time, are skipped.
+        :param cache_only: Return only cached medias without requests to upstreams.
+        :return: List of media records.
+        """
+        records, _ = await self._parse_all(session, string, cache_collection, timeout, cache_only)
+        return records
+
+    async def _parse_all(
+        self,
+        session: aiohttp.ClientSession | None,
+        string: str,
+        cache_collection: AsyncIOMotorCollection | None,
+        timeout: float | None,  # noqa: ASYNC109
+        cache_only: bool,
+        on_result: Callable[[list[MediaRecord]], Any] | None = None,
+    ) -> tuple[list[MediaRecord], list[str]]:
+        """
+        Parse medias from all supported URLs in string within deadline.
+
+        :param on_result: Callback, called with media records of every URL as soon as it's parsed.
+        :return: Media records and URLs, which are not parsed in time.
+        """
+        with tracing.trace("parse") as root, deadline.deadline(timeout):
+            result, timed_out = await self._parse_records(session, string, cache_collection, cache_only, on_result)
+
+        if timed_out:
+            root.attributes["timed_out"] = len(timed_out)
+            logger.warning("Parsing of %d URL(s) is timed out: %s", len(timed_out), ", ".join(timed_out))
+        logger.info("Parsed %d items in %.4f seconds", len(result), root.duration)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Trace of parsing:\n%s", root.format())
+        return result, timed_out
+
+    async def _parse_records(
+        self,
+        session: aiohttp.ClientSession | None,
+        string: str,
+        cache_collection: AsyncIOMotorCollection | None,
+        cache_only: bool,
+        on_result: Callable[[list[MediaRecord]], Any] | None = None,
+    ) -> tuple[list[MediaRecord], list[str]]:
+        cache = MediaCache(
+            cache_collection=cache_collection,
+            memory=self._memory,
+            flights=self._flights,
+            aliases=self._aliases,
+            writer=self._writer,
+            ttls={parser.TYPE: parser.cache_ttl for parser in self._parsers},
+            stale_ttls={parser.TYPE: parser.stale_ttl for parser in self._parsers},
+            metrics=self._metrics,
+            cache_only=cache_only,
+        )
+
+        with self._metrics.time(Stage.ROUTE):
+            matches = self.scan(string)
+        if not matches:
+            return [], []
+        # Tasks copy context, so they share deadline of parsing
+        tasks = [asyncio.ensure_future(_get_media(session, parser, match, cache)) for parser, match in matches]
+        if on_result is not None:
+            for task in tasks:
+                task.add_done_callback(functools.partial(_emit, on_result))
+        try:
+            _, pending = await asyncio.wait(tasks, timeout=deadline.remaining())
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+            raise
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+
+        result: list[MediaRecord] = []
+        timed_out: list[str] = []
+        error: BaseException | None = None
+        for (parser, match), task in zip(matches, tasks, strict=True):
+            exc = None if task.cancelled() else task.exception()
+            if (
+                task.cancelled()
+                or isinstance(exc, deadline.DeadlineExceeded)
+                or (isinstance(exc, TimeoutError) and deadline.expired())
+            ):
+                timed_out.append(match.group(0))
+                self._metrics.count(Event.TIMEOUT, parser.TYPE.value)
+            elif exc is not None:
+                error = error or exc
+            else:
+                result.extend(record for record in task.result() if record)
+        if error is not None:
+            raise error
+        return result, timed_out
 
     def __init_subclass__(cls, **kwargs: BaseParserConfig):
         super().__init_subclass__()
@@ -132,6 +650,7 @@ class BaseParser(ABC, BaseModel):
             raise ValueError("type is required")
 
         cls.TYPE = t
+        cls.HOSTS = tuple(kwargs.get("hosts", ()))
         cls.__doc__ = "Parser for " + str(t.value)
 
     @classmethod
@@ -145,6 +664,10 @@ class BaseParser(ABC, BaseModel):
         schema = dict(jsonref.loads(ParserSchema.schema_json()))
         schema.pop("$defs", None)
         schema.pop("required", None)
+        # Options of the set are passed to BaseParser, not in config of parser
+        for params in schema["properties"].values():
+            for name in SET_OPTIONS:
+                params["properties"].pop(name, None)
         return json.dumps(schema, indent=2, ensure_ascii=False)
 
     def __str__(self):
@@ -152,14 +675,29 @@ class BaseParser(ABC, BaseModel):
 
 
 async def _get_media(
-    session: aiohttp.ClientSession,
+    session: aiohttp.ClientSession | None,
     parser: BaseParser,
     match: re.Match[str],
     cache: MediaCache,
-) -> list[Media]:
+) -> list[MediaRecord]:
     logger.info("Found match for %s: %r", parser.TYPE, match.string)
-    try:
-        return await parser._parse(session, match, cache=cache)
-    except MediaCache.FoundCache as e:
-        logger.info("Found cache for %s", e.original_url)
-        return e.medias
+    # Runs in its own task, so label is set only for this URL
+    PARSER.set(parser.TYPE.value)
+    with parser._metrics.track(), tracing.span("url", parser=parser.TYPE.value, url=match.group(0)) as current:
+        try:
+            return await parser._parse(session, match, cache=cache)
+        except MediaCache.FoundCache as e:
+            logger.info("Found cache for %s", e.original_url)
+            if current is not None:
+                current.attributes["cache"] = "hit"
+            return e.medias
+        except CircuitOpen as e:
+            logger.warning("Skipping %s: %s", match.group(0), e)
+            return []
+
+
+def _emit(on_result: Callable[[list[MediaRecord]], Any], task: asyncio.Future[list[MediaRecord]]) -> None:
+    if task.cancelled() or task.exception() is not None:
+        return
+    if records := [record for record in task.result() if record]:
+        on_result(records)
@@ -1,56 +1,134 @@
 import asyncio
+import functools
 import json
 import logging
 import re
 from re import Match, Pattern
 
 import aiohttp
-from pydantic import Field
+from pydantic import Field, PrivateAttr
 
-from media_parser.models import Media, ParserType, Video
+from media_parser.decoding import Projection
+from media_parser.metrics import Stage
+from media_parser.models import MediaKind, MediaRecord, ParserType
 from media_parser.parsers.base import BaseParser, MediaCache
+from media_parser.selector import RouteSelector, RouteSelectorConfig
 
 logger = logging.getLogger(__name__)
 
 USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36"
 
+# https://www.instagram.com/p/CTQZ5Y8J8ZU/
+# https://www.instagram.com/reel/CTQZ5Y8J8ZU/
+# https://instagram.com/reel/CqQGB-1ISIw/
+INSTAGRAM_RE = re.compile(r"(?:https?://)?(?:www\.)?instagram\.com/(?P<type>\w+)/(?P<id>[\w-]+)")
 
-class InstagramParser(BaseParser, type=ParserType.INSTAGRAM):
+# Fields of GraphQL response, used by parser
+GRAPHQL_FIELDS = Projection(
+    "status",
+    "data.shortcode_media.is_video",
+    "data.shortcode_media.title",
+    "data.shortcode_media.edge_media_to_caption.edges.node.text",
+    "data.shortcode_media.video_url",
+    "data.shortcode_media.display_url",
+    "data.shortcode_media.owner.username",
+    "data.shortcode_media.dimensions",
+    "data.shortcode_media.video_duration",
+)
+# Fields of SaaS API response, used by parser
+SAAS_FIELDS = Projection(
+    "video_url",
+    "title",
+    "caption_text",
+    "thumbnail_url",
+    "video_versions.width",
+    "video_versions.height",
+    "user.username",
+    "video_duration",
+)
+
+
+class InstagramParser(BaseParser, type=ParserType.INSTAGRAM, hosts=("instagram.com",)):
     instagram_saas_token: str | None = Field(default=None, description="Set this for enable instagram proxy")
     instagram_saas_api: str = Field(
         default="https://api.lamadava.com", description="Set this to change instagram saas api"
     )
     user_agent: str = Field(default=USER_AGENT, description="Set this to change user agent")
+    routing: RouteSelectorConfig = Field(
+        default_factory=RouteSelectorConfig,
+        description="Adaptive selection between GraphQL and SaaS routes by their recent success rate and latency",
+    )
+
+    _routes: RouteSelector | None = PrivateAttr(default=None)
 
     def reg_exps(self) -> list[Pattern[str]]:
         return [
-            # https://www.instagram.com/p/CTQZ5Y8J8ZU/
-            # https://www.instagram.com/reel/CTQZ5Y8J8ZU/
-            # https://instagram.com/reel/CqQGB-1ISIw/
-            re.compile(r"(?:https?://)?(?:www\.)?instagram\.com/(?P<type>\w+)/(?P<id>[\w-]+)"),
+            INSTAGRAM_RE,
         ]
 
     def _is_supported(self) -> bool:
         return True
 
+    @property
+    def routes(self) -> RouteSelector:
+        if self._routes is None:
+            self._routes = RouteSelector(self.routing)
+        return self._routes
+
     async def _parse(
         self,
-        session: aiohttp.ClientSession,
+        session: aiohttp.ClientSession | None,
         match: Match,
         cache: MediaCache,
-    ) -> list[Media]:
+    ) -> list[MediaRecord]:
         post_id = match.group("id")
         post_type = match.group("type")
 
         original_url = f"https://www.instagram.com/{post_type}/{post_id}"
 
-        await cache.find_by_original_url(original_url)
+        return await cache.fetch(
+            original_url,
+            functools.partial(self._fetch_medias, cache=cache, original_url=original_url, post_id=post_id),
+            session,
+        )
 
+    async def _fetch_medias(
+        self,
+        session: aiohttp.ClientSession | None,
+        cache: MediaCache,
+        original_url: str,
+        post_id: str,
+    ) -> list[MediaRecord]:
+        routes = {"graphql": functools.partial(self._graphql_route, session, post_id, original_url)}
+        if self.instagram_saas_token:
+            routes["saas"] = functools.partial(self._saas_route, session, post_id, original_url)
+        medias = await self.routes.call(routes)
+        return await cache.save_group(medias or [])
+
+    async def _graphql_route(
+        self,
+        session: aiohttp.ClientSession | None,
+        post_id: str,
+        original_url: str,
+    ) -> list[MediaRecord] | None:
+        with self._metrics.time(Stage.FETCH):
+            data = await self._retry.call("graphql", functools.partial(self._get_graphql_media, session, post_id))
+
+        if data.get("status") == "fail":
+            logger.info("GraphQL failed for %r", original_url)
+            return None
+
+        logger.info("Got data: %s", data)
+        with self._metrics.time(Stage.PROCESS):
+            return self._process_graphql_media(data, original_url)
+
+    async def _get_graphql_media(self, session: aiohttp.ClientSession | None, post_id: str) -> dict:
         variables = {
             "shortcode": post_id,
-            "child_comment_count": 3,
-            "fetch_comment_count": 40,
-            "parent_comment_count": 24,
+            # Comments are not used
+            "child_comment_count": 0,
+            "fetch_comment_count": 0,
+            "parent_comment_count": 0,
             "has_threaded_comments": False,
         }
 
@@ -59,22 +137,17 @@ class InstagramParser(BaseParser, type=ParserType.INSTAGRAM):
             "variables": json.dumps(variables, separators=(",", ":")),
         }
 
-        async with session.get(
+        async with self._transport.get(
             "https://www.instagram.com/graphql/query/",
+            session=session,
             params=params,
             headers={"User-Agent": self.user_agent},
         ) as response:
-            data: dict = await response.json()
-
-        if data.get("status") == "fail" and self.instagram_saas_token:
-            return await self.get_media_from_saas(
-                session=session,
-                cache=cache,
-                media_code=post_id,
-                original_url=original_url,
-            )
+            if response.status >= 500:
+                response.raise_for_status()
+            return await self._transport.json(response, GRAPHQL_FIELDS) or {}
 
-        logger.info("Got data: %s", data)
+    def _process_graphql_media(self, data: dict, original_url: str) -> list[MediaRecord]:
         shortcode_media = data.get("data", {}).get("shortcode_media") or {}
 
         if not shortcode_media.get("is_video", False):
@@ -94,7 +167,8 @@ class InstagramParser(BaseParser, type=ParserType.INSTAGRAM):
 
         thumbnail_url = shortcode_media.get("display_url", None)
 
-        video = Video(
+        video = MediaRecord(
+            kind=MediaKind.VIDEO,
             caption=caption or None,
             type=self.TYPE,
             original_url=original_url,
@@ -106,33 +180,53 @@ class InstagramParser(BaseParser, type=ParserType.INSTAGRAM):
             height=shortcode_media.get("dimensions", {}).get("height", None),
             duration=int(shortcode_media.get("video_duration", "0")) or None,
         )
-        return await cache.save_group([video])
+        return [video]
 
     async def get_media_from_saas(
         self,
-        session: aiohttp.ClientSession,
+        session: aiohttp.ClientSession | None,
         cache: MediaCache,
         media_code: str,
         original_url: str,
-    ) -> list[Media]:
-        if not self.instagram_saas_token:
+    ) -> list[MediaRecord]:
+        medias = await self._saas_route(session, media_code, original_url)
+        if medias is None:
             return []
+        return await cache.save_group(medias)
+
+    async def _saas_route(
+        self,
+        session: aiohttp.ClientSession | None,
+        media_code: str,
+        original_url: str,
+    ) -> list[MediaRecord] | None:
+        if not self.instagram_saas_token:
+            return None
         logger.info("Using instagram saas for %r", original_url)
 
-        async with session.get(
+        with self._metrics.time(Stage.FETCH):
+            data = await self._breakers.call("saas", functools.partial(self._get_saas_media, session, media_code))
+
+        logger.info("Got data: %s", data)
+        if not data:
+            return None
+
+        with self._metrics.time(Stage.PROCESS):
+            return self._process_saas_media(data, original_url)
+
+    async def _get_saas_media(self, session: aiohttp.ClientSession | None, media_code: str) -> dict | None:
+        async with self._transport.get(
             f"{self.instagram_saas_api}/v1/media/by/code",
+            session=session,
             params={"code": media_code},
             headers={"x-access-key": self.instagram_saas_token},
         ) as resp:
             if resp.status != 200:
                 logger.error("Error: %s %s", resp.status, await resp.text())
-                return []
-            data: dict = await resp.json()
-
-        logger.info("Got data: %s", data)
-        if not data:
-            return []
+                return None
+            return await self._transport.json(resp, SAAS_FIELDS)
 
+    def _process_saas_media(self, data: dict, original_url: str) -> list[MediaRecord]:
         url: str | None = data.get("video_url", None)
         if not url:
             logger.info("%s is not a video", original_url)
@@ -142,7 +236,8 @@ class InstagramParser(BaseParser, type=ParserType.INSTAGRAM):
 
         thumbnail_url = data.get("thumbnail_url", None)
         video_meta = data.get("video_versions", [{}])[0]
-        video = Video(
+        video = MediaRecord(
+            kind=MediaKind.VIDEO,
             caption=caption or None,
             type=self.TYPE,
             original_url=original_url,
@@ -154,7 +249,7 @@ class InstagramParser(BaseParser, type=ParserType.INSTAGRAM):
             height=video_meta.get("height", None),
             duration=int(data.get("video_duration", 0)) or None,
         )
-        return await cache.save_group([video])
+        return [video]
 
 
 if __name__ == "__main__":
@@ -1,4 +1,5 @@
 import asyncio
+import functools
 import logging
 import re
 from re import Match, Pattern
@@ -6,27 +7,68 @@ from urllib.parse import urlparse
 
 import aiohttp
 from aiohttp import InvalidURL
-from pydantic import Field
+from pydantic import Field, PrivateAttr
 
-from media_parser.models import Media, ParserType, Video
+from media_parser.batching import BatchConfig, Batcher
+from media_parser.database import MongoModelController, OAuthTokenModel
+from media_parser.decoding import Projection
+from media_parser.metrics import Stage
+from media_parser.models import MediaKind, MediaRecord, ParserType
+from media_parser.oauth import TokenManager
 from media_parser.parsers.base import BaseParser, MediaCache
+from media_parser.quota import QuotaExceeded, RateLimitHeaders
 
 logger = logging.getLogger(__name__)
 
+# redd.it/2gmzqe
+REDDIT_SHORT_RE = re.compile(r"(?:https?://)?(?:www\.)?redd\.it/(?P<id>\w+)")
+# reddit.com/comments/2gmzqe/
+# www.reddit.com/r/redditdev/comments/2gmzqe/praw_https/
+# www.reddit.com/gallery/2gmzqe
+REDDIT_RE = re.compile(r"(?:https?://)?(?:www\.)?reddit\.com/(?P<link>[\w/]+)")
 
-class RedditParser(BaseParser, type=ParserType.REDDIT):
+# Fields of info response (listing of submissions), used by parser
+INFO_FIELDS = Projection(
+    "data.children.data.id",
+    "data.children.data.media.reddit_video.fallback_url",
+    "data.children.data.author",
+    "data.children.data.title",
+    "data.children.data.subreddit",
+    "data.children.data.thumbnail",
+    "data.children.data.preview.enabled",
+    "data.children.data.preview.images.source.url",
+)
+# https://support.reddithelp.com/hc/en-us/articles/16160319875092-Reddit-Data-API-Wiki
+REDDIT_RATE_LIMIT = RateLimitHeaders("x-ratelimit-remaining", "x-ratelimit-reset")
+# https://github.com/reddit-archive/reddit/wiki/OAuth2#application-only-oauth
+REDDIT_TOKEN_URL = "https://www.reddit.com/api/v1/access_token"  # noqa: S105
+REDDIT_API_URL = "https://oauth.reddit.com"
+
+
+class RedditParser(BaseParser, type=ParserType.REDDIT, hosts=("reddit.com", "redd.it")):
     user_agent: str | None = Field("video downloader (by u/Jag_k)", description="User agent for Reddit API")
     client_id: str = Field(..., description="Client ID for Reddit API")
     client_secret: str = Field(..., description="Client secret for Reddit API")
+    token_refresh_margin: float = Field(
+        default=300, ge=0, description="OAuth token is refreshed this count of seconds before expiry"
+    )
+    share_token: bool = Field(
+        default=True, description="Share OAuth token with other workers through tokens collection of cache"
+    )
+    batch: BatchConfig = Field(
+        default_factory=BatchConfig,
+        description="Micro-batching of submission lookups. Concurrent lookups are sent as one request",
+    )
+
+    _tokens: TokenManager | None = PrivateAttr(default=None)
+    _submissions: Batcher[str, dict] | None = PrivateAttr(default=None)
+    # Namespace of tokens collection -> its controller. Lookups are batched by namespace, not by controller of parse
+    _token_controllers: dict[str, MongoModelController[str, OAuthTokenModel]] = PrivateAttr(default_factory=dict)
 
     def reg_exps(self) -> list[Pattern[str]]:
         return [
-            # redd.it/2gmzqe
-            re.compile(r"(?:https?://)?(?:www\.)?redd\.it/(?P<id>\w+)"),
-            # reddit.com/comments/2gmzqe/
-            # www.reddit.com/r/redditdev/comments/2gmzqe/praw_https/
-            # www.reddit.com/gallery/2gmzqe
-            re.compile(r"(?:https?://)?(?:www\.)?reddit\.com/(?P<link>[\w/]+)"),
+            REDDIT_SHORT_RE,
+            REDDIT_RE,
         ]
 
     def _is_supported(self) -> bool:
@@ -39,12 +81,54 @@ class RedditParser(BaseParser, type=ParserType.REDDIT):
             self.client_secret,
         )
 
+    @property
+    def tokens(self) -> TokenManager:
+        if self._tokens is None:
+            self._tokens = TokenManager(f"reddit:{self.client_id}", self._fetch_token, self.token_refresh_margin)
+        return self._tokens
+
+    @property
+    def submissions(self) -> Batcher[str, dict]:
+        if self._submissions is None:
+            self._submissions = Batcher(self._load_submissions, self.batch)
+        return self._submissions
+
+    async def _load_submissions(
+        self,
+        group: tuple[aiohttp.ClientSession | None, str | None],
+        submission_ids: list[str],
+    ) -> dict[str, dict]:
+        session, namespace = group
+        token_controller = self._token_controllers.get(namespace) if namespace is not None else None
+        return await self._breakers.call(
+            "info", functools.partial(info, session, submission_ids, self, token_controller)
+        )
+
+    async def _fetch_token(self, session: aiohttp.ClientSession | None) -> tuple[str, float]:
+        """
+        Get app-only OAuth token.
+
+        :return: Access token and its lifetime in seconds.
+        """
+        async with self._transport.post(
+            REDDIT_TOKEN_URL,
+            session=session,
+            auth=self.auth,
+            data={"grant_type": "client_credentials"},
+            headers={"User-Agent": self.user_agent},
+        ) as resp:
+            resp.raise_for_status()
+            data = await self._transport.json(resp) or {}
+        if "access_token" not in data:
+            raise aiohttp.ClientError(f"Reddit didn't issue access token: {data.get('error')}")
+        return data["access_token"], float(data.get("expires_in", 3600))
+
     async def _parse(
         self,
-        session: aiohttp.ClientSession,
+        session: aiohttp.ClientSession | None,
         match: Match,
         cache: MediaCache,
-    ) -> list[Media]:
+    ) -> list[MediaRecord]:
         try:
             comment_id = match.group("id")
         except (IndexError, InvalidURL):
@@ -55,10 +139,37 @@ class RedditParser(BaseParser, type=ParserType.REDDIT):
 
         original_url = f"https://redd.it/{comment_id}"
 
-        await cache.find_by_original_url(original_url)
+        return await cache.fetch(
+            original_url,
+            functools.partial(self._fetch_medias, cache=cache, original_url=original_url, comment_id=comment_id),
+            session,
+        )
 
+    async def _fetch_medias(
+        self,
+        session: aiohttp.ClientSession | None,
+        cache: MediaCache,
+        original_url: str,
+        comment_id: str,
+    ) -> list[MediaRecord]:
         logger.info("Getting video link from: %s", original_url)
-        cmt = await comment(session, comment_id)
+        try:
+            with self._metrics.time(Stage.FETCH):
+                token_controller = cache.token_controller if self.share_token else None
+                namespace = None
+                if token_controller is not None:
+                    namespace = token_controller.collection.full_name
+                    self._token_controllers[namespace] = token_controller
+                await self.tokens.get(session, token_controller)
+                cmt = await self.submissions.get(comment_id, (session, namespace))
+        except QuotaExceeded as e:
+            logger.warning("Skipping %s: %s", original_url, e)
+            return []
+        with self._metrics.time(Stage.PROCESS):
+            medias = self._process_post(cmt, original_url)
+        return await cache.save_group(medias)
+
+    def _process_post(self, cmt: dict, original_url: str) -> list[MediaRecord]:
         media = cmt.get("media", {})
         if not media:
             logger.info("No media found")
@@ -78,29 +189,58 @@ class RedditParser(BaseParser, type=ParserType.REDDIT):
             thumbnail = cmt["preview"]["images"][0]["source"]["url"]
 
         # TODO: Get video with audio
-        return await cache.save_group(
-            [
-                Video(
-                    original_url=original_url,
-                    author=author,
-                    caption=title,
-                    thumbnail_url=thumbnail,
-                    type=ParserType.REDDIT,
-                    extra_description=f"by u/{author} in r/{subreddit}",
-                    url=video_url,
-                )
-            ]
-        )
+        return [
+            MediaRecord(
+                kind=MediaKind.VIDEO,
+                original_url=original_url,
+                author=author,
+                caption=title,
+                thumbnail_url=thumbnail,
+                type=ParserType.REDDIT,
+                extra_description=f"by u/{author} in r/{subreddit}",
+                url=video_url,
+            )
+        ]
+
+
+async def info(
+    session: aiohttp.ClientSession | None,
+    submission_ids: list[str],
+    reddit_parser: RedditParser,
+    token_controller: MongoModelController[str, OAuthTokenModel] | None = None,
+) -> dict[str, dict]:
+    """
+    Look up submissions without comments with one request.
 
+    :return: Submission ID -> data of submission. It's empty for deleted or unknown submissions.
+    """
+    token = await reddit_parser.tokens.get(session, token_controller)
+    for attempt in range(2):
+        async with reddit_parser._quota.request(
+            reddit_parser._transport,
+            "reddit",
+            REDDIT_RATE_LIMIT,
+            "GET",
+            f"{REDDIT_API_URL}/api/info",
+            session=session,
+            params={"id": ",".join(f"t3_{submission_id}" for submission_id in submission_ids)},
+            headers={"User-Agent": reddit_parser.user_agent, "Authorization": f"bearer {token}"},
+        ) as resp:
+            if resp.status != 401 or attempt:
+                if resp.status >= 500:
+                    resp.raise_for_status()
+                data = await reddit_parser._transport.json(resp, INFO_FIELDS) or {}
+                break
+        # Token is revoked before expiry
+        logger.info("Reddit rejected OAuth token, renewing it")
+        token = await reddit_parser.tokens.renew(token, session, token_controller)
 
-async def comment(session: aiohttp.ClientSession, comment_id: str, reddit_parser: RedditParser) -> dict:
-    async with session.get(
-        f"https://api.reddit.com/comments/{comment_id}",
-        auth=reddit_parser.auth,
-        headers={"User-Agent": reddit_parser.user_agent},
-    ) as resp:
-        data = await resp.json()
-    return data[0].get("data", {}).get("children", [{}])[0].get("data", {})
+    result: dict[str, dict] = {submission_id: {} for submission_id in submission_ids}
+    for child in data.get("data", {}).get("children", []):
+        submission = child.get("data", {})
+        if submission.get("id") in result:
+            result[submission["id"]] = submission
+    return result
 
 
 def id_from_url(url: str) -> str:
@@ -1,4 +1,5 @@
 import asyncio
+import functools
 import logging
 import re
 from re import Match
@@ -8,10 +9,13 @@ import aiohttp
 from aiohttp import ClientSession
 from pydantic import Field
 
+from media_parser.breaker import CircuitOpen
 from media_parser.context import MAX_SIZE
-from media_parser.models import Image, Media, ParserType, Video
+from media_parser.deadline import DeadlineExceeded
+from media_parser.decoding import Projection
+from media_parser.metrics import Event, Stage
+from media_parser.models import MediaKind, MediaRecord, ParserType
 from media_parser.parsers.base import BaseParser, MediaCache
-from media_parser.utils import generate_timer
 
 logger = logging.getLogger(__name__)
 
@@ -20,23 +24,44 @@ TT_USER_AGENT = (
     "+AppleWebKit/537.36+(KHTML,+like+Gecko)+Version/4.0+Chrome/107.0.5304.105+Mobile+Safari/537.36"
 )
 
-time_it = generate_timer(logger)
+# https://www.tiktok.com/t/ZS8s7cPmd/
+TIKTOK_SHORT_RE = re.compile(r"(?:https?://)?(?:www\.)?tiktok\.com/(?P<short_suffix>\w+)/(?P<id>\w+)/?")
+# https://vt.tiktok.com/ZSRq1jcrg/
+# https://vm.tiktok.com/ZSRq1jcrg/
+TIKTOK_DOMAIN_RE = re.compile(r"(?:https?://)?(?:(?P<domain>[a-z]{2})\.)?tiktok\.com/(?P<id>\w+)/?")
+# https://www.tiktok.com/@thejoyegg/video/7136001098841591041
+TIKTOK_VIDEO_RE = re.compile(
+    r"(?:https?://)?(?:www\.)?tiktok\.com/@(?P<author>\w+)/(?P<type_of>video|photo)/(?P<video_id>\d+)/?"
+)
+
+# Fields of feed response, used by parser
+TIKTOK_FEED_FIELDS = Projection(
+    "aweme_list.aweme_type",
+    "aweme_list.desc",
+    "aweme_list.region",
+    "aweme_list.text_extra",
+    "aweme_list.author.nickname",
+    "aweme_list.author.unique_id",
+    "aweme_list.video.cover",
+    "aweme_list.video.origin_cover",
+    "aweme_list.video.dynamic_cover",
+    "aweme_list.video.download_addr.url_list",
+    "aweme_list.video.play_addr.url_list",
+    "aweme_list.video.bit_rate.play_addr",
+    "aweme_list.image_post_info.image_post_info",
+    "aweme_list.image_post_info.images.display_image",
+    "aweme_list.image_post_info.images.owner_watermark_image.url_list",
+)
 
 
-class TiktokParser(BaseParser, type=ParserType.TIKTOK):
+class TiktokParser(BaseParser, type=ParserType.TIKTOK, hosts=("tiktok.com",)):
     user_agent: str = Field(default=TT_USER_AGENT)
 
     def reg_exps(self):
         return [
-            # https://www.tiktok.com/t/ZS8s7cPmd/
-            re.compile(r"(?:https?://)?(?:www\.)?tiktok\.com/(?P<short_suffix>\w+)/(?P<id>\w+)/?"),
-            # https://vt.tiktok.com/ZSRq1jcrg/
-            # https://vm.tiktok.com/ZSRq1jcrg/
-            re.compile(r"(?:https?://)?(?:(?P<domain>[a-z]{2})\.)?tiktok\.com/(?P<id>\w+)/?"),
-            # https://www.tiktok.com/@thejoyegg/video/7136001098841591041
-            re.compile(
-                r"(?:https?://)?(?:www\.)?tiktok\.com/@(?P<author>\w+)/(?P<type_of>video|photo)/(?P<video_id>\d+)/?"
-            ),
+            TIKTOK_SHORT_RE,
+            TIKTOK_DOMAIN_RE,
+            TIKTOK_VIDEO_RE,
         ]
 
     def _is_supported(self) -> bool:
@@ -44,39 +69,54 @@ class TiktokParser(BaseParser, type=ParserType.TIKTOK):
 
     async def _parse(
         self,
-        session: aiohttp.ClientSession,
+        session: aiohttp.ClientSession | None,
         match: Match,
         cache: MediaCache,
-    ) -> list[Media]:
+    ) -> list[MediaRecord]:
         m = match.groupdict({})
-        author: str
-        if "short_suffix" in m:
-            suffix = m["short_suffix"]
-            url_id = m["id"]
-            original_url = f"https://www.tiktok.com/{suffix}/{url_id}"
-            logger.info("Get video id from: %s", original_url)
-            video_location = await self._get_video_id(original_url)
-            if video_location is None:
+        if "short_suffix" in m or "id" in m:
+            if "short_suffix" in m:
+                short_url = f"https://www.tiktok.com/{m['short_suffix']}/{m['id']}"
+            else:
+                short_url = f"https://{m.get('domain') or 'vt'}.tiktok.com/{m['id']}"
+
+            original_url = await cache.find_alias(short_url)
+            if original_url is None and cache.cache_only:
                 return []
-            author, video_id = video_location
-
-        elif "id" in m:
-            url_id = m.get("id")
-            domain = m.get("domain", "vt")
-            original_url = f"https://{domain}.tiktok.com/{url_id}"
-            logger.info("Get video id from: %s", original_url)
-            video_location = await self._get_video_id(original_url)
-            if video_location is None:
+            if original_url is None:
+                logger.info("Get video id from: %s", short_url)
+                with self._metrics.time(Stage.RESOLVE):
+                    video_location = await self._get_video_id(session, short_url)
+                if video_location is None:
+                    return []
+                author, video_id = video_location
+                original_url = f"https://www.tiktok.com/@{author.lower()}/video/{video_id}"
+                await cache.save_alias(short_url, original_url, ttl=self.alias_ttl)
+
+            if not (video_match := TIKTOK_VIDEO_RE.match(original_url)):
                 return []
-            author, video_id = video_location
+            m = video_match.groupdict({})
 
-        else:
-            author = str(m.get("author", "")).lower()
-            video_id: int = int(m.get("video_id"))
-            original_url = f"https://www.tiktok.com/@{author}/video/{video_id}"
+        author: str = str(m.get("author", "")).lower()
+        video_id: int = int(m.get("video_id"))
+        original_url = f"https://www.tiktok.com/@{author}/video/{video_id}"
 
-        await cache.find_by_original_url(original_url)
+        return await cache.fetch(
+            original_url,
+            functools.partial(
+                self._fetch_medias, cache=cache, original_url=original_url, author=author, video_id=video_id
+            ),
+            session,
+        )
 
+    async def _fetch_medias(
+        self,
+        session: aiohttp.ClientSession | None,
+        cache: MediaCache,
+        original_url: str,
+        author: str,
+        video_id: int,
+    ) -> list[MediaRecord]:
         logger.info(
             "Getting video link from: %s (video_id=%d)",
             original_url,
@@ -84,10 +124,16 @@ class TiktokParser(BaseParser, type=ParserType.TIKTOK):
         )
 
         try:
-            with time_it("tiktok_get_video_data"):
-                data: dict = await self._get_media_data(session, video_id)
+            with self._metrics.time(Stage.FETCH):
+                data: dict = await self._retry.call(
+                    "feed",
+                    functools.partial(self._get_media_data, session, video_id),
+                )
 
+        except (CircuitOpen, DeadlineExceeded):
+            raise
         except Exception as e:
+            self._metrics.count(Event.ERROR)
             logger.exception(
                 "Error while getting video data: %s",
                 original_url,
@@ -107,15 +153,16 @@ class TiktokParser(BaseParser, type=ParserType.TIKTOK):
         media_type: Literal["video", "image", None] = data.get("type", None)
         logger.info("Media type: %s", media_type)
 
-        with time_it("process_video"):
+        with self._metrics.time(Stage.PROCESS):
             if media_type == "video":
-                return await cache.save_group(self._process_video(data, original_url))
-
+                medias = self._process_video(data, original_url)
             elif media_type == "image":
-                return await cache.save_group(self._process_image(data, original_url))
-        return []
+                medias = self._process_image(data, original_url)
+            else:
+                return []
+        return await cache.save_group(medias)
 
-    def _process_video(self, data: dict, original_url: str) -> list[Video]:
+    def _process_video(self, data: dict, original_url: str) -> list[MediaRecord]:
         max_quality_url = data.get("video_data", {}).get("nwm_video_url_HQ")
 
         max_size = MAX_SIZE.get()
@@ -140,7 +187,8 @@ class TiktokParser(BaseParser, type=ParserType.TIKTOK):
         nickname: str | None = data.get("author", {}).get("nickname", None)
         language: str | None = data.get("region", None)
 
-        video = Video(
+        video = MediaRecord(
+            kind=MediaKind.VIDEO,
             url=url,
             type=self.TYPE,
             caption=caption,
@@ -154,7 +202,7 @@ class TiktokParser(BaseParser, type=ParserType.TIKTOK):
             return [video]
         return []
 
-    def _process_image(self, data: dict, original_url: str) -> list[Image]:
+    def _process_image(self, data: dict, original_url: str) -> list[MediaRecord]:
         info = data.get("image_post_info", {})
 
         caption: str | None = data.get("desc", None)
@@ -163,7 +211,8 @@ class TiktokParser(BaseParser, type=ParserType.TIKTOK):
         language: str | None = data.get("region", None)
 
         return [
-            Image(
+            MediaRecord(
+                kind=MediaKind.IMAGE,
                 type=self.TYPE,
                 original_url=original_url,
                 url=img.get("url_list", [None])[-1],
@@ -178,26 +227,23 @@ class TiktokParser(BaseParser, type=ParserType.TIKTOK):
             if (img := images.get("display_image", {}))
         ]
 
-    @classmethod
-    async def _get_video_id(cls, url: str) -> tuple[str, int] | None:
+    async def _get_video_id(self, session: ClientSession | None, url: str) -> tuple[str, int] | None:
         counter = 0
-        async with ClientSession() as session:
-            while "@" not in url and counter < 5:
-                async with session.get(url, allow_redirects=False) as resp:
-                    url = resp.headers.get("Location", "").split("?", 1)[0]
-                    if url.startswith("/"):
-                        url = "https://www.tiktok.com" + url
-                    counter += 1
+        while "@" not in url and counter < 5:
+            url = (await self._transport.location(url, session=session) or "").split("?", 1)[0]
+            if url.startswith("/"):
+                url = "https://www.tiktok.com" + url
+            counter += 1
         base = url.rsplit("/", 1)[-1]
         author = url.split("@", 1)[-1].split("/", 1)[0]
         if not base or not base.isdigit():
             return None
         return author, int(base)
 
-    @staticmethod
-    async def _get_media_data(session: ClientSession, video_id: int) -> dict:
-        async with session.get(
+    async def _get_media_data(self, session: ClientSession | None, video_id: int) -> dict:
+        async with self._transport.get(
             "https://api16-normal-c-useast1a.tiktokv.com/aweme/v1/feed/",
+            session=session,
             params={
                 "iid": "7318518857994389254",
                 "device_id": "7318517321748022790",
@@ -210,7 +256,9 @@ class TiktokParser(BaseParser, type=ParserType.TIKTOK):
                 "aweme_id": video_id,
             },
         ) as resp:
-            raw_data: dict = await resp.json()
+            if resp.status >= 500:
+                resp.raise_for_status()
+            raw_data: dict = await self._transport.json(resp, TIKTOK_FEED_FIELDS)
         if not raw_data:
             logger.error("Empty response with %r", resp.url)
             return {}
@@ -1,12 +1,17 @@
+import functools
 import logging
 import re
 from re import Match
 
 import aiohttp
-from pydantic import Field
+from pydantic import Field, PrivateAttr
 
-from media_parser.models import Media, ParserType, Video
+from media_parser.batching import BatchConfig, Batcher
+from media_parser.decoding import Projection
+from media_parser.metrics import Stage
+from media_parser.models import MediaKind, MediaRecord, ParserType
 from media_parser.parsers.base import BaseParser, MediaCache
+from media_parser.quota import QuotaExceeded, RateLimitHeaders
 
 logger = logging.getLogger(__name__)
 
@@ -14,28 +19,57 @@ logger = logging.getLogger(__name__)
 TWITTER_RE = re.compile(r"(?:https?://)?(?:www\.)?twitter\.com/(?P<user>\w+)/status/(?P<id>\d+)")
 # https://x.com/Yoda4ever/status/1580609309217628160
 X_RE = re.compile(r"(?:https?://)?(?:www\.)?x\.com/(?P<user>\w+)/status/(?P<id>\d+)")
+# https://t.co/sOHvySZwUo
+TCO_RE = re.compile(r"(?:https?://)?t\.co/(?P<tco_id>\w+)")
 
+# Fields of tweet response, used by parser
+TWEET_FIELDS = Projection(
+    "data.id",
+    "data.text",
+    "data.author_id",
+    "data.attachments.media_keys",
+    "includes.media.media_key",
+    "includes.media.type",
+    "includes.media.variants",
+    "includes.media.preview_image_url",
+    "includes.users.id",
+    "includes.users.username",
+)
+# https://developer.twitter.com/en/docs/twitter-api/rate-limits
+TWITTER_RATE_LIMIT = RateLimitHeaders("x-rate-limit-remaining", "x-rate-limit-reset", epoch_reset=True)
 
-class TwitterParser(BaseParser, type=ParserType.TWITTER):
+
+class TwitterParser(BaseParser, type=ParserType.TWITTER, hosts=("twitter.com", "x.com", "t.co")):
     twitter_bearer_token: str = Field(..., description="Bearer token for Twitter API")
+    batch: BatchConfig = Field(
+        default_factory=BatchConfig,
+        description="Micro-batching of tweet lookups. Concurrent lookups are sent as one request",
+    )
+
+    _tweets: Batcher[str, dict] | None = PrivateAttr(default=None)
 
     def reg_exps(self):
         return [
             TWITTER_RE,
             X_RE,
-            # https://t.co/sOHvySZwUo
-            re.compile(r"(?:https?://)?t\.co/(?P<tco_id>\w+)"),
+            TCO_RE,
         ]
 
     def _is_supported(self) -> bool:
         return bool(self.twitter_bearer_token)
 
+    @property
+    def tweets(self) -> Batcher[str, dict]:
+        if self._tweets is None:
+            self._tweets = Batcher(self._load_tweets, self.batch)
+        return self._tweets
+
     async def _parse(
         self,
-        session: aiohttp.ClientSession,
+        session: aiohttp.ClientSession | None,
         match: Match,
         cache: MediaCache,
-    ) -> list[Media]:
+    ) -> list[MediaRecord]:
         try:
             tweet_id = match.group("id")
         except IndexError:
@@ -43,28 +77,88 @@ class TwitterParser(BaseParser, type=ParserType.TWITTER):
                 tco_id = match.group("tco_id")
             except IndexError:
                 return []
-            async with session.get(f"https://t.co/{tco_id}") as response:
-                new_match = TWITTER_RE.match(str(response.real_url))
-            return await self._parse(session, new_match, cache)
+            return await self._parse_short_url(session, f"https://t.co/{tco_id}", cache)
 
         original_url = f"https://twitter.com/i/status/{tweet_id}"
 
-        await cache.find_by_original_url(original_url)
+        return await cache.fetch(
+            original_url,
+            functools.partial(self._fetch_medias, cache=cache, original_url=original_url, tweet_id=tweet_id),
+            session,
+        )
 
+    async def _parse_short_url(
+        self,
+        session: aiohttp.ClientSession | None,
+        short_url: str,
+        cache: MediaCache,
+    ) -> list[MediaRecord]:
+        original_url = await cache.find_alias(short_url)
+        if original_url is None and cache.cache_only:
+            return []
+        if original_url is None:
+            with self._metrics.time(Stage.RESOLVE):
+                location = await self._transport.location(short_url, session=session)
+            if not location or not (new_match := TWITTER_RE.match(location) or X_RE.match(location)):
+                logger.info("%s is not a link to tweet: %s", short_url, location)
+                return []
+            original_url = f"https://twitter.com/i/status/{new_match.group('id')}"
+            await cache.save_alias(short_url, original_url, ttl=self.alias_ttl)
+        return await self._parse(session, TWITTER_RE.match(original_url), cache)
+
+    async def _fetch_medias(
+        self,
+        session: aiohttp.ClientSession | None,
+        cache: MediaCache,
+        original_url: str,
+        tweet_id: str,
+    ) -> list[MediaRecord]:
         logger.info("Getting video link from: %s", original_url)
 
-        async with session.get(
-            f"https://api.twitter.com/2/tweets/{tweet_id}",
+        try:
+            with self._metrics.time(Stage.FETCH):
+                data = await self.tweets.get(tweet_id, session)
+        except QuotaExceeded as e:
+            logger.warning("Skipping %s: %s", original_url, e)
+            return []
+        with self._metrics.time(Stage.PROCESS):
+            result = self._process_tweet(data, original_url)
+        return await cache.save_group(result)
+
+    async def _load_tweets(self, session: aiohttp.ClientSession | None, tweet_ids: list[str]) -> dict[str, dict]:
+        return await self._retry.call("tweets", functools.partial(self._get_tweets, session, tweet_ids))
+
+    async def _get_tweets(self, session: aiohttp.ClientSession | None, tweet_ids: list[str]) -> dict[str, dict]:
+        """
+        Look up tweets with one request.
+
+        :return: Tweet ID -> response of single tweet lookup. It's empty for deleted or protected tweets.
+        """
+        async with self._quota.request(
+            self._transport,
+            "twitter:tweets",
+            TWITTER_RATE_LIMIT,
+            "GET",
+            "https://api.twitter.com/2/tweets",
+            session=session,
             params={
+                "ids": ",".join(tweet_ids),
                 "media.fields": "type,variants",
                 "expansions": "attachments.media_keys,author_id",
                 "user.fields": "username",
             },
             headers={"Authorization": f"Bearer {self.twitter_bearer_token}"},
         ) as response:
-            data: dict = await response.json()
-
+            if response.status >= 500:
+                response.raise_for_status()
+            data: dict = await self._transport.json(response, TWEET_FIELDS) or {}
         logger.debug("Got data: %s", data)
+
+        result: dict[str, dict] = {tweet_id: {} for tweet_id in tweet_ids}
+        result.update(_split_tweets(data))
+        return result
+
+    def _process_tweet(self, data: dict, original_url: str) -> list[MediaRecord]:
         includes = data.get("includes", {})
         medias = includes.get("media", [])
         author = includes.get("users", [{}])[0].get("username", None)
@@ -75,7 +169,8 @@ class TwitterParser(BaseParser, type=ParserType.TWITTER):
             if media.get("type") == "video":
                 thumbnail_url = media.get("preview_image_url")
                 result.append(
-                    Video(
+                    MediaRecord(
+                        kind=MediaKind.VIDEO,
                         url=max(
                             media.get("variants", []),
                             key=lambda x: x.get("bit_rate", 0),
@@ -87,4 +182,22 @@ class TwitterParser(BaseParser, type=ParserType.TWITTER):
                         original_url=original_url,
                     )
                 )
-        return await cache.save_group(result)
+        return result
+
+
+def _split_tweets(data: dict) -> dict[str, dict]:
+    """
+    Split response of multi-tweet lookup to responses of single tweet lookups with their own includes.
+    """
+    includes = data.get("includes", {})
+    medias = {media.get("media_key"): media for media in includes.get("media", [])}
+    users = {user.get("id"): user for user in includes.get("users", [])}
+
+    result: dict[str, dict] = {}
+    for tweet in data.get("data", []):
+        media_keys = tweet.get("attachments", {}).get("media_keys", [])
+        tweet_includes: dict[str, list] = {"media": [medias[key] for key in media_keys if key in medias]}
+        if (user := users.get(tweet.get("author_id"))) is not None:
+            tweet_includes["users"] = [user]
+        result[tweet.get("id")] = {"data": tweet, "includes": tweet_includes}
+    return result
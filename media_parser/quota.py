@@ -0,0 +1,240 @@
+import asyncio
+import contextlib
+import logging
+import time
+from collections.abc import AsyncIterator, Mapping
+from dataclasses import dataclass
+
+import aiohttp
+from pydantic import BaseModel, Field
+
+from media_parser import deadline
+from media_parser.metrics import Event, Metrics, Stage
+from media_parser.transport import Transport
+
+__all__ = (
+    "Quota",
+    "QuotaConfig",
+    "QuotaExceeded",
+    "QuotaManager",
+    "RateLimitHeaders",
+)
+
+logger = logging.getLogger(__name__)
+
+
+class QuotaConfig(BaseModel):
+    """
+    Config of upstream API quota tracking.
+
+    :param reserve: Count of requests, that are kept in reserve until quota is reset.
+    :param pace_below: Requests are spread evenly until reset, when fewer requests remain.
+    :param max_wait: Max time to wait for quota in seconds. Requests, that would wait longer, are rejected.
+    """
+
+    reserve: int = Field(
+        default=1, ge=0, description="Count of requests, that are kept in reserve until quota is reset"
+    )
+    pace_below: int = Field(
+        default=10,
+        ge=0,
+        description="Requests are spread evenly until reset, when fewer requests remain (0 disables pacing)",
+    )
+    max_wait: float = Field(
+        default=30,
+        ge=0,
+        description="Max time to wait for quota in seconds. Requests, that would wait longer, are rejected",
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class RateLimitHeaders:
+    """
+    Names of rate limit headers of upstream API.
+
+    :param remaining: Header with count of remaining requests.
+    :param reset: Header with time of quota reset.
+    :param epoch_reset: Reset is a UNIX timestamp, otherwise it's count of seconds until reset.
+    """
+
+    remaining: str
+    reset: str
+    epoch_reset: bool = False
+
+
+@dataclass(slots=True)
+class Quota:
+    """
+    Known state of quota.
+
+    :param remaining: Count of remaining requests, reported by upstream. None if it's unknown.
+    :param reset_at: Monotonic time of quota reset.
+    :param pending: Count of requests, which are sent, but not answered yet.
+    :param next_at: Monotonic time of next paced request.
+    """
+
+    remaining: float | None = None
+    reset_at: float = 0
+    pending: int = 0
+    next_at: float = 0
+
+
+class QuotaExceeded(Exception):  # noqa: N818
+    """
+    Raised when quota is exhausted and its reset is too far.
+    """
+
+    def __init__(self, key: str, wait: float):
+        super().__init__(f"Quota {key!r} is exhausted for {wait:.1f} seconds")
+        self.key = key
+        self.wait = wait
+
+
+class QuotaManager:
+    """
+    Tracks quotas of rate-limited upstream APIs by their response headers.
+
+    State is shared by all parse calls. When quota runs low, requests are paced evenly until reset;
+    when it's exhausted, requests wait for reset or are rejected, if reset is later than `max_wait`.
+
+    :param config: Quota config.
+    :param metrics: Metrics hook. Waits are observed as `quota_wait` stage, rejections are counted.
+    """
+
+    def __init__(self, config: QuotaConfig | None = None, metrics: Metrics | None = None):
+        self.config = config or QuotaConfig()
+        self.metrics = metrics or Metrics()
+        self.quotas: dict[str, Quota] = {}
+
+    async def acquire(self, key: str) -> None:
+        """
+        Wait until request can be sent. Call :meth:`release` after response.
+
+        :param key: Key of quota, e.g. API and endpoint.
+        :raise QuotaExceeded: If request would wait longer than `max_wait` or deadline of parsing.
+        """
+        quota = self.quotas.get(key)
+        if quota is None:
+            quota = self.quotas[key] = Quota()
+
+        now = time.monotonic()
+        delay, next_at = self._delay(quota, now)
+        if delay > deadline.timeout(self.config.max_wait):
+            self.metrics.count(Event.QUOTA_REJECTED)
+            raise QuotaExceeded(key, delay)
+
+        quota.next_at = next_at
+        quota.pending += 1
+        if delay > 0:
+            logger.debug("Waiting %.2f seconds for quota %r", delay, key)
+            try:
+                with self.metrics.time(Stage.QUOTA_WAIT):
+                    await asyncio.sleep(delay)
+            except BaseException:
+                quota.pending -= 1
+                raise
+
+    def release(self, key: str) -> None:
+        quota = self.quotas.get(key)
+        if quota is not None and quota.pending > 0:
+            quota.pending -= 1
+
+    def update(self, key: str, rate_limit: RateLimitHeaders, status: int, headers: Mapping[str, str]) -> None:
+        """
+        Update quota from response headers.
+
+        :param key: Key of quota.
+        :param rate_limit: Names of rate limit headers.
+        :param status: Status of response. Quota is exhausted on 429.
+        :param headers: Headers of response.
+        """
+        remaining = _number(headers.get(rate_limit.remaining))
+        reset = _number(headers.get(rate_limit.reset))
+        epoch_reset = rate_limit.epoch_reset
+        if status == 429:
+            remaining = 0
+            if reset is None:
+                reset, epoch_reset = _number(headers.get("Retry-After")), False
+        if remaining is None or reset is None:
+            return
+
+        quota = self.quotas.get(key)
+        if quota is None:
+            quota = self.quotas[key] = Quota()
+        quota.remaining = remaining
+        quota.reset_at = time.monotonic() + max(reset - time.time() if epoch_reset else reset, 0)
+
+    @contextlib.asynccontextmanager
+    async def request(
+        self,
+        transport: Transport,
+        key: str,
+        rate_limit: RateLimitHeaders,
+        method: str,
+        url: str,
+        session: aiohttp.ClientSession | None = None,
+        **kwargs,
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        """
+        Make request through transport within quota. Request is repeated once after reset, if it's rate limited.
+
+        :param transport: Transport.
+        :param key: Key of quota.
+        :param rate_limit: Names of rate limit headers.
+        :param method: HTTP method.
+        :param url: URL.
+        :param session: Client session to use instead of pooled one.
+        :param kwargs: Arguments of :meth:`aiohttp.ClientSession.request`.
+        :return: Context manager with response.
+        :raise QuotaExceeded: If request would wait for quota longer than `max_wait`.
+        """
+        for attempt in range(2):
+            await self.acquire(key)
+            try:
+                async with transport.request(method, url, session=session, **kwargs) as resp:
+                    self.update(key, rate_limit, resp.status, resp.headers)
+                    if resp.status == 429 and attempt == 0:
+                        logger.info("Rate limited by %s, retrying after reset of quota %r", url, key)
+                        continue
+                    yield resp
+                    return
+            finally:
+                self.release(key)
+
+    def stats(self) -> dict[str, dict[str, float | None]]:
+        """
+        Get known state of quotas.
+        """
+        now = time.monotonic()
+        return {
+            key: {
+                "remaining": quota.remaining,
+                "reset_in": max(quota.reset_at - now, 0),
+                "pending": quota.pending,
+            }
+            for key, quota in self.quotas.items()
+        }
+
+    def _delay(self, quota: Quota, now: float) -> tuple[float, float]:
+        """
+        Get delay of request and time of the next paced request.
+        """
+        if quota.remaining is None or now >= quota.reset_at:
+            return 0, quota.next_at
+        available = quota.remaining - quota.pending - self.config.reserve
+        if available <= 0:
+            return quota.reset_at - now, quota.next_at
+        if available >= self.config.pace_below:
+            return 0, quota.next_at
+        # Spread remaining requests evenly until reset
+        start = max(now, quota.next_at)
+        return start - now, start + (quota.reset_at - now) / available
+
+
+def _number(value: str | None) -> float | None:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
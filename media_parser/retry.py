@@ -0,0 +1,206 @@
+import asyncio
+import collections
+import functools
+import logging
+import random
+import time
+from collections.abc import Awaitable, Callable
+
+from pydantic import BaseModel, Field
+
+from media_parser import deadline
+from media_parser.breaker import FAILURE_ERRORS, CircuitBreakers
+from media_parser.metrics import Event, Metrics
+
+__all__ = (
+    "RETRYABLE_ERRORS",
+    "RetryBudget",
+    "RetryConfig",
+    "RetryPolicy",
+)
+
+logger = logging.getLogger(__name__)
+
+# Errors of attempt, which are retried. Raise `aiohttp.ClientResponseError` for retryable statuses
+RETRYABLE_ERRORS: tuple[type[BaseException], ...] = FAILURE_ERRORS
+# Count of latency samples, kept for hedging
+LATENCY_SAMPLES = 100
+# Hedged requests are not sent until this count of latency samples is collected
+MIN_LATENCY_SAMPLES = 20
+
+
+class RetryConfig(BaseModel):
+    """
+    Config of retries and hedged requests to upstream API.
+
+    :param attempts: Max count of attempts, including the first one.
+    :param timeout: Timeout of one attempt in seconds. It's bounded by deadline of parsing.
+    :param backoff: Base delay before retry in seconds. It's doubled on every retry and jittered.
+    :param max_backoff: Max delay before retry in seconds.
+    :param budget_ratio: Retries and hedges, which are earned by every request.
+    :param budget_reserve: Max count of retries and hedges, which are saved up.
+    :param hedge_percentile: Percentile of latency, after which hedged request is sent.
+    """
+
+    attempts: int = Field(default=3, ge=1, description="Max count of attempts, including the first one")
+    timeout: float | None = Field(default=10, gt=0, description="Timeout of one attempt in seconds")
+    backoff: float = Field(
+        default=0.2,
+        ge=0,
+        description="Base delay before retry in seconds. It's doubled on every retry and jittered",
+    )
+    max_backoff: float = Field(default=2, ge=0, description="Max delay before retry in seconds")
+    budget_ratio: float = Field(
+        default=0.2,
+        ge=0,
+        description="Retries and hedges, which are earned by every request. Limits retry storms",
+    )
+    budget_reserve: int = Field(default=10, ge=0, description="Max count of retries and hedges, which are saved up")
+    hedge_percentile: float | None = Field(
+        default=None,
+        gt=0,
+        lt=100,
+        description="Set this for send hedged request, when the first one is slower than this percentile of latency",
+    )
+
+
+class RetryBudget:
+    """
+    Token bucket, that limits retries to a share of requests.
+
+    :param ratio: Tokens, which are earned by every request.
+    :param reserve: Max count of tokens. Bucket starts full.
+    """
+
+    def __init__(self, ratio: float, reserve: int):
+        self.ratio = ratio
+        self.reserve = reserve
+        self.tokens = float(reserve)
+
+    def deposit(self) -> None:
+        self.tokens = min(self.tokens + self.ratio, self.reserve)
+
+    def withdraw(self) -> bool:
+        """
+        Take token for retry.
+
+        :return: False if budget is exhausted.
+        """
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class RetryPolicy:
+    """
+    Retries upstream calls with jittered exponential backoff and optionally hedges slow ones.
+
+    Retries and hedges share one budget, so a failing upstream is not hammered by retry storms.
+    Latency of successful attempts is tracked by key, so hedged request is sent only when
+    the first one is slower than usual for the same endpoint.
+    Every attempt passes circuit breaker of the endpoint, and open breaker is not retried.
+
+    :param config: Retry config.
+    :param metrics: Metrics hook. Retries, hedges and exhausted budget are counted.
+    :param breakers: Circuit breakers of endpoints.
+    """
+
+    def __init__(
+        self,
+        config: RetryConfig | None = None,
+        metrics: Metrics | None = None,
+        breakers: CircuitBreakers | None = None,
+    ):
+        self.config = config or RetryConfig()
+        self.metrics = metrics or Metrics()
+        self.breakers = breakers
+        self.budget = RetryBudget(self.config.budget_ratio, self.config.budget_reserve)
+        self.latencies: dict[str, collections.deque[float]] = {}
+
+    async def call[T](self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        Call upstream with retries.
+
+        :param key: Key of endpoint for latency tracking and circuit breaker.
+        :param factory: Function, that returns awaitable with result. It's called for every attempt.
+        :return: Result of the first successful attempt.
+        :raise: Error of the last attempt.
+        :raise CircuitOpen: If circuit breaker of endpoint is open.
+        """
+        self.budget.deposit()
+        attempt = 1
+        while True:
+            try:
+                return await self._attempt(key, factory)
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.config.attempts:
+                    raise
+                # Full jitter spreads retries of concurrent requests
+                backoff = min(self.config.max_backoff, self.config.backoff * 2 ** (attempt - 1))
+                delay = random.uniform(0, backoff)  # noqa: S311
+                if (left := deadline.remaining()) is not None and left <= delay:
+                    raise
+                if not self.budget.withdraw():
+                    self.metrics.count(Event.RETRY_BUDGET_EXHAUSTED)
+                    raise
+                logger.info("Attempt %d of %s failed: %r. Retrying in %.3f seconds", attempt, key, e, delay)
+                self.metrics.count(Event.RETRY)
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    def hedge_delay(self, key: str) -> float | None:
+        """
+        Get latency percentile of endpoint, after which hedged request is sent.
+
+        :param key: Key of endpoint.
+        :return: Delay in seconds or None, if hedging is disabled or latency is not known yet.
+        """
+        samples = self.latencies.get(key)
+        if self.config.hedge_percentile is None or samples is None or len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return ordered[int(self.config.hedge_percentile / 100 * (len(ordered) - 1))]
+
+    async def _attempt[T](self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        if self.breakers is None:
+            return await self._timed(key, factory)
+        return await self.breakers.call(key, functools.partial(self._timed, key, factory))
+
+    async def _timed[T](self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        start = time.perf_counter()
+        delay = self.hedge_delay(key)
+        async with asyncio.timeout(deadline.timeout(self.config.timeout)):
+            if delay is None:
+                result = await factory()
+            else:
+                result = await self._hedged(factory, delay)
+
+        samples = self.latencies.get(key)
+        if samples is None:
+            samples = self.latencies[key] = collections.deque(maxlen=LATENCY_SAMPLES)
+        samples.append(time.perf_counter() - start)
+        return result
+
+    async def _hedged[T](self, factory: Callable[[], Awaitable[T]], delay: float) -> T:
+        """
+        Send hedged request, if the first one is not done after delay. The first successful result wins.
+        """
+        pending: set[asyncio.Future[T]] = {asyncio.ensure_future(factory())}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done and self.budget.withdraw():
+                self.metrics.count(Event.HEDGE)
+                pending.add(asyncio.ensure_future(factory()))
+            error: BaseException | None = None
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                if not pending:
+                    raise error
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,135 @@
+import re
+from collections.abc import Hashable, Iterable
+from re import Match, Pattern
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from media_parser.parsers.base import BaseParser
+
+__all__ = ("Router",)
+
+HOST_RE = re.compile(r"(?:https?://)?(?P<host>[^/\s?#:]+)", re.IGNORECASE)
+SCHEME_RE = re.compile(r"^(?:https?://)?(?:www\.)?", re.IGNORECASE)
+
+Route = tuple["BaseParser", tuple[Pattern[str], ...]]
+
+
+class Router:
+    """
+    Host-indexed URL router.
+
+    Built once from a set of parsers: patterns of every parser are collected a single time
+    and indexed by the hosts the parser declares. Routing a URL costs one host lookup
+    and runs only the patterns of the parsers registered for that host.
+
+    Free text is handled by :meth:`scan`, which rejects text without any known host
+    before running any URL matching.
+
+    :param parsers: Parsers to route to.
+    """
+
+    def __init__(self, parsers: Iterable["BaseParser"]):
+        self.routes: dict[str, list[Route]] = {}
+        for parser in parsers:
+            patterns = tuple(parser.reg_exps())
+            for host in parser.HOSTS:
+                self.routes.setdefault(host.lower(), []).append((parser, patterns))
+
+        # Host must not be followed by more host characters: `x.com` must not match `x.community`
+        hosts = "|".join(re.escape(host) for host in sorted(self.routes, key=len, reverse=True)) or r"(?!)"
+        self.hosts_re = re.compile(hosts, re.IGNORECASE)
+        self.url_re = re.compile(
+            rf"(?<![\w.@/-])(?:https?://)?(?:[\w-]+\.)*(?:{hosts})(?![\w.-]*\w)[^\s<>\"'`]*",
+            re.IGNORECASE,
+        )
+
+    @staticmethod
+    def host(url: str) -> str | None:
+        """
+        Extract lowercase host from URL. Scheme is optional.
+
+        :param url: URL to extract host from.
+        :return: Host or None if URL has no host.
+        """
+        match = HOST_RE.match(url)
+        if not match:
+            return None
+        return match.group("host").lower()
+
+    def candidates(self, host: str) -> list[Route]:
+        """
+        Get parsers registered for host.
+
+        Subdomains fall back to their parent domains, so `vt.tiktok.com` and `www.tiktok.com`
+        are both served by a parser registered for `tiktok.com`.
+
+        :param host: Lowercase host.
+        :return: List of parsers with their patterns.
+        """
+        while host:
+            if (found := self.routes.get(host)) is not None:
+                return found
+            _, _, host = host.partition(".")
+        return []
+
+    def route(self, url: str) -> list[tuple["BaseParser", Match[str]]]:
+        """
+        Find parsers for URL.
+
+        Only the first matching pattern of every candidate parser is returned.
+
+        :param url: URL to route.
+        :return: List of parsers with match of their pattern.
+        """
+        host = self.host(url)
+        if not host:
+            return []
+
+        result = []
+        for parser, patterns in self.candidates(host):
+            for reg_exp in patterns:
+                if match := reg_exp.match(url):
+                    result.append((parser, match))
+                    break
+        return result
+
+    @staticmethod
+    def canonical(match: Match[str]) -> Hashable:
+        """
+        Get key of media matched by parser's pattern.
+
+        Named groups of the pattern identify media regardless of URL form, pattern without named groups
+        falls back to URL without scheme and `www.`.
+
+        :param match: Match of parser's pattern.
+        :return: Key, equal for URLs of the same media.
+        """
+        groups = match.groupdict()
+        if not groups:
+            return SCHEME_RE.sub("", match.group(0)).rstrip("/")
+        return tuple((name, value.rstrip("/") if value else value) for name, value in sorted(groups.items()))
+
+    def scan(self, text: str) -> list[tuple["BaseParser", Match[str]]]:
+        """
+        Find all supported URLs anywhere in text.
+
+        Text without a known host is rejected before any URL matching.
+        The same media found several times is routed once: URLs are compared by the named groups of the parser's
+        pattern (e.g. ID), so `youtu.be/<id>` and `youtube.com/watch?v=<id>` are the same media.
+
+        :param text: Text to scan, e.g. chat message.
+        :return: List of parsers with match of their pattern, in order of appearance.
+        """
+        if "." not in text or not self.hosts_re.search(text):
+            return []
+
+        seen: set[tuple[int, Hashable]] = set()
+        result = []
+        for url_match in self.url_re.finditer(text):
+            for parser, match in self.route(url_match.group(0)):
+                key = (id(parser), self.canonical(match))
+                if key in seen:
+                    continue
+                seen.add(key)
+                result.append((parser, match))
+        return result
@@ -0,0 +1,211 @@
+import asyncio
+import collections
+import logging
+import time
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import dataclass, field
+
+from pydantic import BaseModel, Field
+
+from media_parser import deadline
+from media_parser.breaker import FAILURE_ERRORS, CircuitOpen
+
+__all__ = (
+    "RouteSelector",
+    "RouteSelectorConfig",
+    "RouteStats",
+)
+
+logger = logging.getLogger(__name__)
+
+# Expected errors of route. Any other error fails route too, but it's logged with traceback
+ROUTE_ERRORS: tuple[type[BaseException], ...] = (*FAILURE_ERRORS, CircuitOpen)
+# Count of latency samples, kept for racing
+LATENCY_SAMPLES = 100
+# Routes are not raced until this count of latency samples is collected
+MIN_LATENCY_SAMPLES = 20
+
+
+class RouteSelectorConfig(BaseModel):
+    """
+    Config of adaptive selection between alternative upstream routes.
+
+    :param window: Time in seconds, outcomes of route are kept for. Route, which outcomes expired, is tried again.
+    :param min_calls: Min count of outcomes in window, before route can be demoted.
+    :param min_success_rate: Route with lower success rate is tried after healthy routes.
+    :param race_percentile: Percentile of latency of route, after which the next route is raced with it.
+    """
+
+    window: float = Field(
+        default=60,
+        gt=0,
+        description="Time in seconds, outcomes of route are kept for. Route, which outcomes expired, is tried again",
+    )
+    min_calls: int = Field(default=5, gt=0, description="Min count of outcomes in window, before route can be demoted")
+    min_success_rate: float = Field(
+        default=0.5, ge=0, le=1, description="Route with lower success rate is tried after healthy routes"
+    )
+    race_percentile: float | None = Field(
+        default=None,
+        gt=0,
+        lt=100,
+        description="Set this for race the next route, when the first one is slower than this percentile of latency",
+    )
+
+
+@dataclass(slots=True)
+class RouteStats:
+    """
+    Recent outcomes and latency of route.
+
+    :param outcomes: Monotonic time and success of recent calls.
+    :param latencies: Latency of recent successful calls in seconds.
+    """
+
+    outcomes: collections.deque[tuple[float, bool]] = field(default_factory=collections.deque)
+    latencies: collections.deque[float] = field(default_factory=lambda: collections.deque(maxlen=LATENCY_SAMPLES))
+
+    def success_rate(self) -> float | None:
+        if not self.outcomes:
+            return None
+        return sum(success for _, success in self.outcomes) / len(self.outcomes)
+
+
+class RouteSelector:
+    """
+    Chooses between alternative upstream routes of the same data by their recent success rate and latency.
+
+    Routes are tried one by one in order of preference, but routes, which fail now, go last,
+    so requests don't pay for a round trip to a failing upstream. Failed route is tried first again,
+    when its outcomes expire. Optionally, when the first route is slower than usual, the next one is raced with it.
+
+    :param config: Selector config.
+    """
+
+    def __init__(self, config: RouteSelectorConfig | None = None):
+        self.config = config or RouteSelectorConfig()
+        self.routes: dict[str, RouteStats] = {}
+
+    def order(self, routes: list[str]) -> list[str]:
+        """
+        Sort routes by health. Healthy routes keep order of preference.
+
+        :param routes: Names of routes in order of preference.
+        :return: Names of routes in order of calls.
+        """
+        now = time.monotonic()
+
+        def rank(index_route: tuple[int, str]) -> tuple[bool, float, int]:
+            index, route = index_route
+            stats = self._stats(route, now)
+            rate = stats.success_rate()
+            if rate is None or len(stats.outcomes) < self.config.min_calls or rate >= self.config.min_success_rate:
+                return False, 0, index
+            return True, -rate, index
+
+        return [route for _, route in sorted(enumerate(routes), key=rank)]
+
+    def race_delay(self, route: str) -> float | None:
+        """
+        Get latency percentile of route, after which the next route is raced with it.
+
+        :param route: Name of route.
+        :return: Delay in seconds or None, if racing is disabled or latency is not known yet.
+        """
+        stats = self.routes.get(route)
+        if self.config.race_percentile is None or stats is None or len(stats.latencies) < MIN_LATENCY_SAMPLES:
+            return None
+        ordered = sorted(stats.latencies)
+        return ordered[int(self.config.race_percentile / 100 * (len(ordered) - 1))]
+
+    def record(self, route: str, success: bool, latency: float | None = None) -> None:
+        """
+        Record outcome of route call.
+
+        :param route: Name of route.
+        :param success: Route returned data.
+        :param latency: Duration of successful call in seconds.
+        """
+        now = time.monotonic()
+        stats = self._stats(route, now)
+        stats.outcomes.append((now, success))
+        if success and latency is not None:
+            stats.latencies.append(latency)
+
+    async def call[T](self, routes: Mapping[str, Callable[[], Awaitable[T | None]]]) -> T | None:
+        """
+        Call routes in order of their health until one of them returns data.
+
+        :param routes: Name of route -> function, that returns awaitable with data or None, if route failed.
+            Routes are in order of preference.
+        :return: Data of the first successful route or None, if all routes failed without errors.
+        :raise: Error of the last failed route, if all routes failed. Deadline of caller is raised immediately.
+        """
+        queue = self.order(list(routes))
+        pending: dict[asyncio.Future[T | None], tuple[str, float]] = {}
+        error: BaseException | None = None
+
+        def start() -> None:
+            route = queue.pop(0)
+            pending[asyncio.ensure_future(routes[route]())] = route, time.perf_counter()
+
+        start()
+        try:
+            while pending:
+                timeout = None
+                if queue and len(pending) == 1:
+                    timeout = self.race_delay(next(iter(pending.values()))[0])
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    logger.info("Route %s is slow, racing %s", next(iter(pending.values()))[0], queue[0])
+                    start()
+                    continue
+                for task in done:
+                    route, started = pending.pop(task)
+                    exc = task.exception()
+                    # Deadline of caller is not a failure of route, and the rest routes have no time anyway
+                    if isinstance(exc, deadline.DeadlineExceeded) or (
+                        isinstance(exc, TimeoutError) and deadline.expired()
+                    ):
+                        raise exc
+                    result = None if exc is not None else task.result()
+                    self.record(route, result is not None, time.perf_counter() - started)
+                    if result is not None:
+                        return result
+                    if exc is None or isinstance(exc, ROUTE_ERRORS):
+                        logger.info("Route %s failed: %r", route, exc)
+                    else:
+                        logger.warning("Route %s failed with unexpected error", route, exc_info=exc)
+                    error = exc or error
+                if not pending and queue:
+                    start()
+        finally:
+            for task in pending:
+                task.cancel()
+        if error is not None:
+            raise error
+        return None
+
+    def stats(self) -> dict[str, dict[str, float | None]]:
+        """
+        Get success rate, median latency and count of recent calls by route.
+        """
+        now = time.monotonic()
+        result = {}
+        for route in self.routes:
+            stats = self._stats(route, now)
+            latencies = sorted(stats.latencies)
+            result[route] = {
+                "success_rate": stats.success_rate(),
+                "latency": latencies[len(latencies) // 2] if latencies else None,
+                "calls": len(stats.outcomes),
+            }
+        return result
+
+    def _stats(self, route: str, now: float) -> RouteStats:
+        stats = self.routes.get(route)
+        if stats is None:
+            stats = self.routes[route] = RouteStats()
+        while stats.outcomes and stats.outcomes[0][0] < now - self.config.window:
+            stats.outcomes.popleft()
+        return stats
@@ -0,0 +1,67 @@
+import asyncio
+import logging
+from collections.abc import Callable, Coroutine
+from typing import Any
+
+from media_parser import deadline
+from media_parser.context import detached_context
+
+__all__ = ("SingleFlight",)
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight[T]:
+    """
+    In-process request coalescing.
+
+    Concurrent calls of :meth:`do` with the same key share one execution of the factory.
+    The execution runs in its own task, so cancelling one of the waiters does not cancel it
+    for the others. It runs without deadline and tracing span of the caller, which started it,
+    and every waiter waits for it within its own deadline.
+    """
+
+    def __init__(self):
+        self._flights: dict[str, asyncio.Future[T]] = {}
+
+    async def do(self, key: str, factory: Callable[[], Coroutine[Any, Any, T]]) -> T:
+        """
+        Run factory once for all concurrent callers with the same key.
+
+        :param key: Key of flight, e.g. canonical URL.
+        :param factory: Function, that returns awaitable with result.
+        :return: Result of factory.
+        :raise TimeoutError: If deadline of caller is passed before flight is done.
+        """
+        async with asyncio.timeout(deadline.timeout()):
+            return await asyncio.shield(self.start(key, factory))
+
+    def start(self, key: str, factory: Callable[[], Coroutine[Any, Any, T]]) -> asyncio.Future[T]:
+        """
+        Start flight in background or join running one.
+
+        :param key: Key of flight.
+        :param factory: Function, that returns awaitable with result.
+        :return: Future of flight.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = asyncio.get_running_loop().create_task(factory(), context=detached_context())
+            self._flights[key] = flight
+            flight.add_done_callback(lambda f: self._done(key, f))
+        else:
+            logger.debug("Joined flight for %s", key)
+        return flight
+
+    def _done(self, key: str, flight: asyncio.Future[T]) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Retrieve exception, so it's not reported as never retrieved when all waiters are gone
+        if not flight.cancelled() and (exc := flight.exception()) is not None:
+            logger.debug("Flight for %s failed: %r", key, exc)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._flights
+
+    def __len__(self) -> int:
+        return len(self._flights)
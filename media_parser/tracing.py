@@ -0,0 +1,141 @@
+import contextlib
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from typing import Any
+
+from media_parser.context import SPAN
+
+__all__ = (
+    "Span",
+    "current_span",
+    "span",
+    "trace",
+)
+
+
+@dataclass(slots=True)
+class Span:
+    """
+    Timed unit of work. Spans form a tree: one root span per request and child spans per stage.
+
+    :param name: Name of span, e.g. stage of parsing.
+    :param attributes: Additional data, e.g. parser or URL.
+    """
+
+    name: str
+    attributes: dict[str, Any] = field(default_factory=dict)
+    children: list["Span"] = field(default_factory=list)
+    start: float = field(default_factory=time.perf_counter)
+    end: float | None = None
+
+    @property
+    def duration(self) -> float:
+        """
+        Duration in seconds. Duration of unfinished span is measured until now.
+        """
+        end = time.perf_counter() if self.end is None else self.end
+        return end - self.start
+
+    def finish(self) -> None:
+        if self.end is None:
+            self.end = time.perf_counter()
+
+    def breakdown(self) -> dict[str, float]:
+        """
+        Get total duration of descendant spans by their name in seconds.
+        Concurrent spans (e.g. fetches of several URLs) are summed up.
+        """
+        result: dict[str, float] = {}
+        stack = list(self.children)
+        while stack:
+            child = stack.pop()
+            result[child.name] = result.get(child.name, 0) + child.duration
+            stack.extend(child.children)
+        return result
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Convert span tree to JSON-serializable dict with durations in milliseconds.
+        Offset is time from start of this span.
+        """
+        return self._to_dict(self.start)
+
+    def _to_dict(self, origin: float) -> dict[str, Any]:
+        result: dict[str, Any] = {
+            "name": self.name,
+            "offset_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+        }
+        if self.attributes:
+            result["attributes"] = self.attributes
+        if self.children:
+            result["children"] = [child._to_dict(origin) for child in self.children]
+        return result
+
+    def format(self) -> str:
+        """
+        Render span tree as indented text, e.g. for debug logs.
+        """
+        lines: list[str] = []
+        stack: list[tuple[Span, int]] = [(self, 0)]
+        while stack:
+            item, depth = stack.pop()
+            attributes = " ".join(f"{key}={value}" for key, value in item.attributes.items())
+            lines.append(f"{'  ' * depth}{item.name} {item.duration * 1000:.3f} ms {attributes}".rstrip())
+            stack.extend((child, depth + 1) for child in reversed(item.children))
+        return "\n".join(lines)
+
+
+def current_span() -> Span | None:
+    """
+    Get span of current context or None, if request is not traced.
+    """
+    return SPAN.get()
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span | None]:
+    """
+    Open child span of current span. Does nothing, if request is not traced.
+
+    Span is stored in context variable, so it's propagated to tasks of :func:`asyncio.gather`
+    and to thread jobs of :class:`media_parser.executor.BoundedExecutor`.
+    If code block fails, name of exception is added to attributes.
+
+    :param name: Name of span.
+    :param attributes: Attributes of span.
+    """
+    parent = SPAN.get()
+    if parent is None:
+        yield None
+        return
+    with _open(Span(name, attributes), parent) as child:
+        yield child
+
+
+@contextlib.contextmanager
+def trace(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Open span of request. It's a root span, if there is no current one, otherwise it's a child span.
+
+    :param name: Name of span.
+    :param attributes: Attributes of span.
+    """
+    with _open(Span(name, attributes), SPAN.get()) as root:
+        yield root
+
+
+@contextlib.contextmanager
+def _open(item: Span, parent: Span | None) -> Iterator[Span]:
+    if parent is not None:
+        parent.children.append(item)
+    token = SPAN.set(item)
+    try:
+        yield item
+    except BaseException as e:
+        item.attributes["exception"] = type(e).__name__
+        raise
+    finally:
+        item.finish()
+        SPAN.reset(token)
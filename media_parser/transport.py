@@ -0,0 +1,206 @@
+import asyncio
+import contextlib
+import logging
+import re
+from collections.abc import AsyncIterator
+from typing import Any
+
+import aiohttp
+from aiohttp import hdrs
+from pydantic import BaseModel, Field
+from yarl import URL
+
+from media_parser import deadline
+from media_parser.decoding import JsonDecoderName, Projection, get_decoder
+
+__all__ = (
+    "Transport",
+    "TransportConfig",
+)
+
+logger = logging.getLogger(__name__)
+
+# `application/json` and `application/<vendor>+json`, like in :meth:`aiohttp.ClientResponse.json`
+JSON_CONTENT_TYPE_RE = re.compile(r"^application/(?:[\w.+-]+?\+)?json")
+
+
+class TransportConfig(BaseModel):
+    """
+    Config of HTTP transport, shared by parsers.
+
+    :param limit: Max count of simultaneous connections.
+    :param limit_per_host: Max count of simultaneous connections to one host.
+    :param host_limits: Max count of simultaneous requests to specific hosts.
+    :param dns_cache_ttl: Time to live of cached DNS records in seconds.
+    :param keepalive_timeout: Time to keep idle connection alive in seconds.
+    :param warmup_urls: URLs to pre-connect on warm-up.
+    :param json_decoder: JSON decoder of responses.
+    :param project_from: Size of response body in bytes, from which field projections of parsers are applied.
+    """
+
+    limit: int = Field(default=100, ge=0, description="Max count of simultaneous connections (0 is unlimited)")
+    limit_per_host: int = Field(
+        default=20, ge=0, description="Max count of simultaneous connections to one host (0 is unlimited)"
+    )
+    host_limits: dict[str, int] = Field(
+        default_factory=dict,
+        description="Max count of simultaneous requests to specific hosts, e.g. `{'api.twitter.com': 5}`",
+    )
+    dns_cache_ttl: int = Field(default=300, ge=0, description="Time to live of cached DNS records in seconds")
+    keepalive_timeout: float = Field(default=60, gt=0, description="Time to keep idle connection alive in seconds")
+    warmup_urls: list[str] = Field(default_factory=list, description="URLs to pre-connect on warm-up")
+    json_decoder: JsonDecoderName = Field(
+        default="auto",
+        description="JSON decoder of responses: `orjson`, `json` or `auto` (orjson if it's installed)",
+    )
+    project_from: int | None = Field(
+        default=128 * 1024,
+        ge=0,
+        description="Size of response body in bytes, from which field projections of parsers are applied. "
+        "Projection costs CPU, so it's worth only for big payloads. Set null for disable projections",
+    )
+
+
+class Transport:
+    """
+    Pooled HTTP transport.
+
+    Owns one client session with keep-alive connection pool and DNS cache, which is created lazily
+    in the running event loop. Requests to hosts from `host_limits` are limited separately.
+
+    :param config: Transport config.
+    """
+
+    def __init__(self, config: TransportConfig | None = None):
+        self.config = config or TransportConfig()
+        self._session: aiohttp.ClientSession | None = None
+        self._decode = get_decoder(self.config.json_decoder)
+        self._semaphores: dict[str, asyncio.Semaphore] = {
+            host.lower(): asyncio.Semaphore(limit) for host, limit in self.config.host_limits.items()
+        }
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """
+        Pooled client session. Must be used inside running event loop.
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.config.limit,
+                limit_per_host=self.config.limit_per_host,
+                use_dns_cache=True,
+                ttl_dns_cache=self.config.dns_cache_ttl,
+                keepalive_timeout=self.config.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    @contextlib.asynccontextmanager
+    async def request(
+        self,
+        method: str,
+        url: str,
+        session: aiohttp.ClientSession | None = None,
+        **kwargs,
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        """
+        Make request through transport. Request is bounded by deadline of current context, if timeout is not passed.
+
+        :param method: HTTP method.
+        :param url: URL.
+        :param session: Client session to use instead of pooled one.
+        :param kwargs: Arguments of :meth:`aiohttp.ClientSession.request`.
+        :return: Context manager with response.
+        :raise DeadlineExceeded: If deadline is passed.
+        """
+        left = deadline.check()
+        if left is not None and "timeout" not in kwargs:
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=left)
+        semaphore = self._semaphores.get(URL(url).host or "")
+        async with contextlib.AsyncExitStack() as stack:
+            if semaphore is not None:
+                await stack.enter_async_context(semaphore)
+            yield await stack.enter_async_context((session or self.session).request(method, url, **kwargs))
+
+    def get(self, url: str, session: aiohttp.ClientSession | None = None, **kwargs):
+        return self.request("GET", url, session=session, **kwargs)
+
+    def post(self, url: str, session: aiohttp.ClientSession | None = None, **kwargs):
+        return self.request("POST", url, session=session, **kwargs)
+
+    def head(self, url: str, session: aiohttp.ClientSession | None = None, **kwargs):
+        return self.request("HEAD", url, session=session, **kwargs)
+
+    async def json(self, resp: aiohttp.ClientResponse, projection: Projection | None = None) -> Any:
+        """
+        Decode JSON response with decoder of transport.
+
+        Like :meth:`aiohttp.ClientResponse.json`, response must have JSON content type, so HTML error pages
+        fail as client errors, which are counted by retries and circuit breakers.
+
+        :param resp: Response.
+        :param projection: Fields to keep. All fields are kept if it's None or body is smaller than `project_from`.
+        :return: Decoded payload or None if response body is empty.
+        :raise aiohttp.ContentTypeError: If response has not JSON content type.
+        :raise aiohttp.ClientPayloadError: If response body is not a valid JSON.
+        """
+        body = await resp.read()
+        content_type = resp.headers.get(hdrs.CONTENT_TYPE, "").lower()
+        if not JSON_CONTENT_TYPE_RE.match(content_type):
+            raise aiohttp.ContentTypeError(
+                resp.request_info,
+                resp.history,
+                status=resp.status,
+                message=f"Attempt to decode JSON with unexpected mimetype: {content_type}",
+                headers=resp.headers,
+            )
+        if not body.strip():
+            return None
+        try:
+            data = self._decode(body)
+        except ValueError as e:
+            raise aiohttp.ClientPayloadError(f"Invalid JSON in response of {resp.url}: {e}") from e
+        if projection is not None and self.config.project_from is not None and len(body) >= self.config.project_from:
+            data = projection(data)
+        return data
+
+    async def location(
+        self,
+        url: str,
+        session: aiohttp.ClientSession | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> str | None:
+        """
+        Get redirect location of URL without following redirect and downloading response body.
+
+        :param url: URL to resolve.
+        :param session: Client session to use instead of pooled one.
+        :param headers: Request headers.
+        :return: Value of `Location` header or None if URL is not a redirect.
+        """
+        async with self.head(url, session=session, headers=headers, allow_redirects=False) as resp:
+            if resp.status != 405:
+                return resp.headers.get("Location")
+        # HEAD is not allowed, GET without reading body
+        async with self.get(url, session=session, headers=headers, allow_redirects=False) as resp:
+            return resp.headers.get("Location")
+
+    async def warmup(self) -> None:
+        """
+        Pre-connect to `warmup_urls`, so DNS lookups and TLS handshakes are done before the first request.
+        """
+
+        async def connect(url: str):
+            try:
+                async with self.head(url, allow_redirects=False):
+                    pass
+            except aiohttp.ClientError as exc:
+                logger.warning("Can't warm up connection to %s: %r", url, exc)
+
+        await asyncio.gather(*(connect(url) for url in self.config.warmup_urls))
+        logger.info("Warmed up %d connection(s)", len(self.config.warmup_urls))
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
@@ -1,6 +1,16 @@
 import functools
 import logging
 import time
+from datetime import UTC, datetime
+from urllib.parse import parse_qs, urlsplit
+
+# Query params of CDN URLs with expiry timestamp and base of their value
+EXPIRY_PARAMS: dict[str, int] = {
+    "x-expires": 10,  # TikTok
+    "expire": 10,  # YouTube, TikTok
+    "expires": 10,
+    "oe": 16,  # Instagram
+}
 
 
 def generate_timer(logger: logging.Logger | None = None):
@@ -30,10 +40,30 @@ class Timer:
         self.logger = logger
 
     def __enter__(self):
-        self.start = time.time()
+        self.start = time.perf_counter()
 
     def __exit__(self, *args):
-        self.end = time.time()
+        self.end = time.perf_counter()
 
         if self.logger:
             self.logger.debug(f"{self.name} took {self.end - self.start} seconds")
+
+
+def url_expiry(url: str | None) -> datetime | None:
+    """
+    Get expiry time of CDN URL from its query params.
+
+    :param url: URL of media.
+    :return: Expiry time or None if URL has no expiry.
+    """
+    if not url or "?" not in url:
+        return None
+    query = parse_qs(urlsplit(url).query)
+    for name, base in EXPIRY_PARAMS.items():
+        if not (values := query.get(name)):
+            continue
+        try:
+            return datetime.fromtimestamp(int(values[0], base), UTC)
+        except (ValueError, OverflowError, OSError):
+            continue
+    return None